@@ -1,109 +1,40 @@
 import time
 import random
+from concurrent.futures import ProcessPoolExecutor
 from math import sqrt, log, comb
 
-import pygame
 import operator
 import math
 import numpy as np
-from ast import literal_eval as tuple_from_string
-from copy import deepcopy
-
-from Tree import Tree, TreeNode, _pretty_print_data
-from card_maps import territory_attack_map, risk_cards
-from troop import Troop
+from functools import partial
+
+from Tree import Tree, _pretty_print_data
+from actions import PLACE, ATTACK, ADVANCE, FORTIFY, encode_action, get_action_kind, get_action_source, \
+    get_action_target, is_action_won
+from battle import DiceStream, attack_win_probability, get_attack_outcome
+from card_maps import risk_cards
+from game_state import COLORS, GameState, NO_OWNER, OWNER, TROOPS
+from playout import DEFAULT_HORIZON, DEFAULT_MAX_ATTACKS, HEURISTIC_POLICY, PlayoutEngine
+from topology import TERRITORY_COUNT, TERRITORY_NAMES, TERRITORY_INDEX, NEIGHBORS, CONTINENT_BONUSES, \
+    CONTINENT_MEMBERSHIP, CONTINENT_BONUS_VECTOR, CONTINENT_SIZE_VECTOR, is_adjacent
+from transposition import DEFAULT_MAX_ENTRIES, TranspositionTable, merge_counters
+from zobrist import hash_card_hand, hash_side_to_move
 from itertools import product
 
 
-def create_location_troop_coordinates():
-    troop_locations = {}
-
-    location_file = open("locations.txt")
-    locations = location_file.read().split("\n")
-    location_file.close()
-
-    with open("territories.txt", "r") as territories:
-        start = 0
-        stop = 3
-        for territory in territories.read().split("\n"):
-            if len(territory) == 0:
-                continue
-
-            troop_locations[territory] = [tuple_from_string(x) for x in locations[start:stop + 1]]
-            start = stop + 1
-            stop += 4
-
-    return troop_locations
-
-
 # [Red, Light Blue, Green, Black] ---> Order for referencing colors
 def get_color_index(color):
-    return ["Red", "Light Blue", "Green", "Black"].index(color)
+    return COLORS.index(color)
 
 
 def get_color_by_index(index):
-    return ["Red", "Light Blue", "Green", "Black"][index]
-
-
-def simulate_dice_roll():
-    return random.randint(1, 6)
-
-
-def simulate_attack(attacking_armies, defending_armies, max_rounds=10):
-    remaining_attacking_armies = attacking_armies
-    remaining_defending_armies = defending_armies
-
-    for i in range(max_rounds):
-        # Stop simulating if the attacking territory cannot attack anymore
-        if remaining_attacking_armies <= 1:
-            break
-
-        # Stop simulating if the defending territory is captured
-        if remaining_defending_armies <= 0:
-            break
-
-        # Attacker rolls up to three dice
-        attack_dice = sorted([random.randint(1, 6) for _ in range(min(3, remaining_attacking_armies - 1))],
-                             reverse=True)
-
-        # Defender rolls up to two dice
-        defense_dice = sorted([random.randint(1, 6) for _ in range(min(2, remaining_defending_armies))], reverse=True)
-
-        # Compare each pair of dice
-        for j in range(min(len(attack_dice), len(defense_dice))):
-            if attack_dice[j] > defense_dice[j]:
-                # Attacker wins, defender loses one army
-                remaining_defending_armies -= 1
-            else:
-                # Defender wins, attacker loses one army
-                remaining_attacking_armies -= 1
+    return COLORS[index]
 
-    # Estimate the win probability based on the number of remaining armies
-    if remaining_defending_armies <= 0:
-        win_probability = 1.0
-    else:
-        win_probability = float(remaining_attacking_armies - 1) / float(attacking_armies)
 
-    return win_probability
+def find_owner_of_territory_in_gamestate(territory, state):
+    color_index = state.get_owner(territory)
 
-
-def calculate_attack_success_probability(attack_armies, defence_armies):
-    total = 100000
-    success = 0
-    for _ in range(total):
-        result = simulate_attack(attack_armies, defence_armies)
-        if result:
-            success += 1
-
-    return success / total
-
-
-def find_owner_of_territory_in_gamestate(territory, territories_in_gs):
-    for color, territories in territories_in_gs.items():
-        if territory in territories:
-            return color
-
-    return None
+    return None if color_index == NO_OWNER else get_color_by_index(color_index)
 
 
 def allocate_troops(total_troops, territory_dict):
@@ -196,12 +127,45 @@ def allocate_fortification_troops(full_map, map_dict, source_territory, num_troo
 
 
 def backpropagate(node, reward, total):
-    # Update the statistics of the current node
-    node.num_visits += total
-    node.reward += reward
-    # Recursively update the statistics of the parent nodes
-    if node.parent is not None:
-        backpropagate(node.parent, reward, total)
+    # Update the statistics of the node and every ancestor, walking up the parent links
+    while node is not None:
+        node.num_visits += total
+        node.reward += reward
+        node = node.parent
+
+
+def backpropagate_batch(results):
+    """
+    Applies many (leaf, reward, count) results in one pass. Updates are summed on the way up, deepest nodes
+    first, so an ancestor shared by several leaves is updated once with their combined reward and count.
+    """
+    pending = {}
+    by_depth = {}
+
+    for leaf, reward, total in results:
+        if leaf in pending:
+            leaf_reward, leaf_total = pending[leaf]
+            pending[leaf] = (leaf_reward + reward, leaf_total + total)
+        else:
+            pending[leaf] = (reward, total)
+            by_depth.setdefault(leaf.depth, []).append(leaf)
+
+    for depth in range(max(by_depth, default=-1), -1, -1):
+        for node in by_depth.get(depth, ()):
+            reward, total = pending.pop(node)
+            node.num_visits += total
+            node.reward += reward
+
+            parent = node.parent
+            if parent is None:
+                continue
+
+            if parent in pending:
+                parent_reward, parent_total = pending[parent]
+                pending[parent] = (parent_reward + reward, parent_total + total)
+            else:
+                pending[parent] = (reward, total)
+                by_depth.setdefault(parent.depth, []).append(parent)
 
 
 def get_key_territories():
@@ -219,61 +183,123 @@ def get_key_territories():
     ]
 
 
-class RiskGame:
-    PLAYER = 0
-    TURNS_PLAYED = 0
-    PICK_TERRITORIES_MODE = True
-    DRAW = True
-    ATTACK_MODE = False
-    TERRITORIES_REMAINING_COUNT = {"Red": 30, "Light Blue": 30, "Green": 30, "Black": 30}
-    TERRITORIES_OWNED = {"Red": [], "Light Blue": [], "Green": [], "Black": []}
-    CARDS_OWNED = {"Red": [], "Light Blue": [], "Green": [], "Black": []}
-    MATCHES_MADE = 0
-
-    def __init__(self, surface, background, update_ui_callback):
-        self._territory_file_path = "territories.txt"
-        self.surface = surface
-        self._location_troop_coordinates = create_location_troop_coordinates()
+KEY_TERRITORIES = tuple(TERRITORY_INDEX[territory] for territory in get_key_territories())
 
-        self._troops_on_board = self._create_territory_troop_map()
+# fixed caps on the attacks the strategy expanders add, used when the search does not widen progressively
+AGGRESSIVE_ATTACK_SOURCES = 5
+AGGRESSIVE_ATTACKS_PER_SOURCE = 4
+MAX_STRATEGY_ATTACKS = 12
 
-        self.imported_cards = deepcopy(risk_cards)
-        self.territory_attack_map = deepcopy(territory_attack_map)
+# weights of the terms of the static evaluation, see RiskGame.evaluate_game_states
+GEOGRAPHIC_POSITIONING_COEFFICIENT = 0.75
+TERRITORIES_OWNED_COEFFICIENT = 0.5
+TROOP_STRENGTH_COEFFICIENT = 0.4
+CONTINENTS_OWNED_COEFFICIENT = 0.88
 
-        self.CARDS = self._create_card_deck()
-        self.TERRITORIES_REMAINING = self._get_all_territories()
-        self.TERRITORY_ATTACK_COUNT = {t: 0 for t in self._get_all_territories()}
-        self.BACKGROUND = background
 
-        self.ui_callback = update_ui_callback
+def get_widening_limit(widening, num_visits):
+    # progressive widening: a node visited N times may have max(1, c * N ** alpha) of its widened children
+    c, alpha = widening
+    return max(1, int(c * num_visits ** alpha))
 
-        random.shuffle(self.CARDS)
 
-    def _create_territory_troop_map(self):
-        troop_map = {}
-        with open(self._territory_file_path, "r") as data:
-            for territory in data.read().split("\n"):
-                if len(territory) == 0:
-                    continue
+def _run_search_worker(game, color, seed, max_ms, max_iterations, max_nodes, batch_size, widening):
+    # runs in a worker process, on its own copy of the game
+    game.rng = random.Random(seed)
+    search_tree = game._search(color, max_ms, max_iterations, max_nodes, batch_size, widening)
 
-                coordinates = self._location_troop_coordinates[territory]
-                troops_created = []
-                for index, coordinate in enumerate(coordinates):
-                    color = get_color_by_index(index)
-                    troops_created.append(Troop(self.surface, color, coordinate, number=0))
-                troop_map[territory] = troops_created
+    return game._summarize_root(search_tree), search_tree.get_search_stats()
 
-        return troop_map
 
-    def _get_all_territories(self):
-        territories = []
-        with open(self._territory_file_path, "r") as data:
-            for territory in data.read().split("\n"):
-                if len(territory) == 0:
-                    continue
-                territories.append(territory)
+class RiskGame:
+    PLAYER = 0
+    TURNS_PLAYED = 0
+    PICK_TERRITORIES_MODE = True
+    DRAW = True
+    ATTACK_MODE = False
+    MATCHES_MADE = 0
+    TRANSPOSITION_TABLE_SIZE = DEFAULT_MAX_ENTRIES
+    # root-parallel search: with more than one worker, each worker process searches its own tree from the same root
+    # and the root statistics are merged
+    SEARCH_WORKERS = 1
+    # default search budgets for find_best_move (per worker when searching in parallel); None is unlimited, and
+    # with no budget at all the search stops once the turn tree is fully grown
+    SEARCH_MAX_MS = None
+    SEARCH_MAX_ITERATIONS = None
+    SEARCH_MAX_NODES = None
+    # leaf-parallel search: leaves selected and evaluated together per step, and the evaluation charged against a
+    # node for each selection of the step that passed through it
+    SEARCH_BATCH_SIZE = 1
+    VIRTUAL_LOSS = 1.0
+    # progressive widening of attacks as (c, alpha), see _search; None keeps the strategy expanders' fixed caps
+    SEARCH_WIDENING = None
+    # simulation step: playouts per simulated leaf, how many turns (of any color) each plays before it is cut off
+    # and evaluated, its policy (see playout) and the most battles a player fights per playout turn
+    PLAYOUTS_PER_SIMULATION = 1
+    PLAYOUT_HORIZON = DEFAULT_HORIZON
+    PLAYOUT_POLICY = HEURISTIC_POLICY
+    PLAYOUT_MAX_ATTACKS = DEFAULT_MAX_ATTACKS
+
+    def __init__(self, surface=None, background=None, update_ui_callback=None, seed=None):
+        # the rules and position live in plain Python / NumPy; pygame is only loaded when there is a surface to
+        # draw on, so a headless game (servers, search workers) never touches SDL or the sprite images
+        self.state = GameState()
+        self.view = None
+
+        if surface is not None:
+            from board_view import BoardView
+            self.view = BoardView(surface, background, update_ui_callback)
+
+        self.TERRITORIES_REMAINING_COUNT = {"Red": 30, "Light Blue": 30, "Green": 30, "Black": 30}
+        # territory ids (see topology) each color owns
+        self.TERRITORIES_OWNED = {"Red": [], "Light Blue": [], "Green": [], "Black": []}
+        # position of each owned territory id in its owner's TERRITORIES_OWNED list, for O(1) removal on conquest
+        self._owned_positions = {}
+        self.CARDS_OWNED = {"Red": [], "Light Blue": [], "Green": [], "Black": []}
+
+        # static tables are shared rather than copied, nothing mutates them
+        self.imported_cards = risk_cards
 
-        return territories
+        self.CARDS = self._create_card_deck()
+        self.TERRITORIES_REMAINING = list(range(TERRITORY_COUNT))
+
+        # every die rolled in combat comes from this stream, and every other random choice of the game (card
+        # shuffles, troop placement, attack picks, search playouts) from rng, so a seeded game can be replayed exactly
+        self.dice = DiceStream(seed)
+        self.rng = random.Random(seed)
+
+        # positions reached by the last search; its counters report how often move orders transposed
+        self.transposition_table = None
+        # node, evaluation and transposition counts of the last search
+        self.search_stats = None
+        self._search_pool = None
+
+        self.rng.shuffle(self.CARDS)
+
+    def __getstate__(self):
+        # what a search worker needs, which is sent with every move: the model, not the view or this process's pool,
+        # nor what a search never uses. The live dice stream (its buffer of rolls is nearly all of a pickled game),
+        # the generator (the worker gets its own seed) and the static card table
+        state = self.__dict__.copy()
+        for name in ("view", "transposition_table", "search_stats", "_search_pool", "dice", "rng", "imported_cards"):
+            state[name] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.imported_cards = risk_cards
+
+    def close(self):
+        # shuts down the root-parallel search workers, if any were started
+        if self._search_pool is not None:
+            self._search_pool.shutdown()
+            self._search_pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def _create_card_deck(self):
         deck = []
@@ -284,8 +310,7 @@ class RiskGame:
         return deck
 
     def send_troops(self, color, territory, number):
-        color_index = get_color_index(color)
-        self._troops_on_board[territory][color_index].number += number
+        self.state.add_troops(TERRITORY_INDEX[territory], number)
 
     def change_turn(self):
         if self.PLAYER == 3:
@@ -300,45 +325,34 @@ class RiskGame:
 
     def _select_territory(self, color, choices):
         while True:
-            territory = random.choice(choices)
-            territory_not_contained = True
-
-            for c in self.TERRITORIES_OWNED.keys():
-                if territory in self.TERRITORIES_OWNED[c]:
-                    territory_not_contained = False
-                    break
+            territory = self.rng.choice(choices)
 
-            if territory_not_contained:
+            if self._find_owner_of_territory(territory) is None:
                 return territory
 
-    def _get_continent_owned_bonus(self, color, territories_in_gs):
-        if territories_in_gs is None:
-            territories_in_gs = self.TERRITORIES_OWNED
+    def _get_territories_owned(self, color, state=None):
+        # territory ids, from the live position when no state is given
+        if state is None:
+            state = self.state
+
+        return state.get_territories(get_color_index(color))
+
+    def _get_continent_owned_bonus(self, color, state=None):
+        if state is None:
+            state = self.state
+
+        color_index = get_color_index(color)
 
         bonus = 0
-        troop_bonuses = {"NA": 5, "SA": 2, "EU": 5, "AF": 3, "AS": 7, "AU": 2}
-        territories_by_continent = {
-            "NA": ["Alaska", "Northwest Territory", "Greenland", "Alberta", "Ontario", "Quebec",
-                   "Western United States", "Eastern United States", "Central America"],
-            "SA": ["Venezuela", "Peru", "Brazil", "Argentina"],
-            "EU": ["Iceland", "Scandinavia", "Ukraine", "Great Britain", "Northern Europe", "Southern Europe",
-                   "Western Europe"],
-            "AF": ["North Africa", "Egypt", "East Africa", "Congo", "South Africa", "Madagascar"],
-            "AS": ["Ural", "Siberia", "Yakutsk", "Kamchatka", "Afghanistan", "Middle East", "India", "China",
-                   "Mongolia", "Japan", "Irkutsk", "Kazakhstan", "Siam"],
-            "AU": ["Indonesia", "New Guinea", "Western Australia", "Eastern Australia"]
-        }
-
-        for continent, territories in territories_by_continent.items():
-            if territories in territories_in_gs[color]:
-                bonus += troop_bonuses[continent]
 
-        return bonus
+        for continent, continent_bonus in CONTINENT_BONUSES.items():
+            if state.owns_continent(color_index, continent):
+                bonus += continent_bonus
 
-    def _get_card_trade_bonus(self, color, territories_in_gs):
+        return bonus
 
-        if territories_in_gs is None:
-            territories_in_gs = self.TERRITORIES_OWNED
+    def _get_card_trade_bonus(self, color, state=None):
+        territories_owned = set(self._get_territories_owned(color, state))
 
         bonus = 0
 
@@ -361,7 +375,7 @@ class RiskGame:
                 if len(cards_found) == 3:
                     break
 
-                if card[0] in territories_in_gs[color]:
+                if TERRITORY_INDEX.get(card[0]) in territories_owned:
                     best_card = card
                     break
                 elif card[1] == "Wild" and not wild_card_used:
@@ -381,7 +395,7 @@ class RiskGame:
 
         if different_cards_bonus:
             for card in cards_found:
-                if card[0] in territories_in_gs[color]:
+                if TERRITORY_INDEX.get(card[0]) in territories_owned:
                     territory_bonus_1 = 2
                     match_cards_1 = cards_found
                     break
@@ -411,7 +425,7 @@ class RiskGame:
 
                 match_cards_2.clear()
                 for card in cards:
-                    if card in territories_in_gs[color]:
+                    if TERRITORY_INDEX.get(card) in territories_owned:
                         territory_bonus_2 += 2
                         match_cards_2 = cards
                         break
@@ -451,7 +465,7 @@ class RiskGame:
         self.MATCHES_MADE += 1
 
         # add cards to back of deck
-        random.shuffle(matched_cards_to_remove)  # shuffle cards before adding them back
+        self.rng.shuffle(matched_cards_to_remove)  # shuffle cards before adding them back
         for card in matched_cards_to_remove:
             self.CARDS_OWNED[color].remove(card)
             self.CARDS.append(card)
@@ -461,7 +475,7 @@ class RiskGame:
     def _draw_card(self, color):
         if len(self.CARDS) == 0:
             self.CARDS = self._create_card_deck()
-            random.shuffle(self.CARDS)
+            self.rng.shuffle(self.CARDS)
 
         card = self.CARDS[0]
 
@@ -471,69 +485,77 @@ class RiskGame:
 
     def _place_troops_before_attack(self, color, troop_count):
 
-        territories_to_place = random.choices(self.TERRITORIES_OWNED[color], k=troop_count)
+        territories_to_place = self.rng.choices(self.TERRITORIES_OWNED[color], k=troop_count)
 
         while troop_count > 0:
             for territory in territories_to_place:
-                troops_to_place = random.randint(1, len(territories_to_place))
-                color_index = get_color_index(color)
+                troops_to_place = self.rng.randint(1, len(territories_to_place))
 
-                troop = self._troops_on_board[territory][color_index]
-                troop.number += troops_to_place
-                troop.highlight = True
+                self.state.add_troops(territory, troops_to_place)
+                if self.view is not None:
+                    self.view.highlight_territory(TERRITORY_NAMES[territory], get_color_index(color))
 
                 troop_count -= troops_to_place
 
     def _kill_highlights(self, color):
-        for troops in self._troops_on_board.values():
-            for troop in troops:
-                troop.highlight = False
-                troop.arrow = False
-                troop.highlight_attack = False
-                troop.highlight_defend = False
+        if self.view is not None:
+            self.view.kill_highlights()
 
     def _find_owner_of_territory(self, territory):
-        for color, territories in self.TERRITORIES_OWNED.items():
-            if territory in territories:
-                return color
+        # the live state's owner row is the territory -> owner index
+        return find_owner_of_territory_in_gamestate(territory, self.state)
+
+    def _set_territory_owner(self, territory, color):
+        # every live change of ownership goes through here so the state and the TERRITORIES_OWNED lists agree;
+        # a territory leaves its old owner's list by swapping the last entry into its slot
+        previous_color = self._find_owner_of_territory(territory)
+        if previous_color == color:
+            return
+
+        if previous_color is not None:
+            territories = self.TERRITORIES_OWNED[previous_color]
+            position = self._owned_positions[territory]
+            last_territory = territories.pop()
 
-        return None
+            if last_territory != territory:
+                territories[position] = last_territory
+                self._owned_positions[last_territory] = position
 
-    def _run_attack_sequence(self, attack_color, defence_color, territory_attacking, territory_defending):
+        self._owned_positions[territory] = len(self.TERRITORIES_OWNED[color])
+        self.TERRITORIES_OWNED[color].append(territory)
+        self.state.set_owner(territory, get_color_index(color))
+
+    def _run_attack_sequence(self, attack_color, defence_color, attacking, defending):
         attack_color_index = get_color_index(attack_color)
         defence_color_index = get_color_index(defence_color)
+        # names for the view and the log
+        territory_attacking = TERRITORY_NAMES[attacking]
+        territory_defending = TERRITORY_NAMES[defending]
 
-        attack_troop = self._troops_on_board[territory_attacking][attack_color_index]
-        defending_troop = self._troops_on_board[territory_defending][defence_color_index]
-
-        attack_troop.highlight_attack = True
-        attack_troop.arrow = True
-        defending_troop.highlight_defend = True
-        defending_troop.arrow = True
+        if self.view is not None:
+            self.view.highlight_attack(territory_attacking, territory_defending, attack_color_index,
+                                       defence_color_index)
 
-        max_attack_dice_rolls = min(attack_troop.number - 1, 3)
-        max_defence_dice_rolls = min(defending_troop.number, 2)
+        max_attack_dice_rolls = min(self.state.get_troops(attacking) - 1, 3)
+        max_defence_dice_rolls = min(self.state.get_troops(defending), 2)
 
-        attack_dice_rolls = random.randint(1, max_attack_dice_rolls) if max_attack_dice_rolls != 1 else 1
+        attack_dice_rolls = self.dice.randint(1, max_attack_dice_rolls) if max_attack_dice_rolls != 1 else 1
 
         if max_defence_dice_rolls == 0:
             print(
                 f"ATTACK SUCCESS. ATTACKER: {attack_color} DEFENDER: {defence_color}  {territory_attacking} vs. "
                 f"{territory_defending} DEFENDER LOSES 0 TROOPS")
 
-            self.TERRITORIES_OWNED[defence_color].remove(territory_defending)
-            self.TERRITORIES_OWNED[attack_color].append(territory_defending)
-
-            defending_troop.color = attack_color
-            defending_troop.number = attack_dice_rolls
+            self._set_territory_owner(defending, attack_color)
+            self.state.set_troops(defending, attack_dice_rolls)
 
             print(f"CLAIM ALERT: ATTACKER: {attack_color} claimed {territory_defending}")
             return 1
 
-        defence_dice_rolls = random.randint(1, max_defence_dice_rolls) if max_defence_dice_rolls != 1 else 1
+        defence_dice_rolls = self.dice.randint(1, max_defence_dice_rolls) if max_defence_dice_rolls != 1 else 1
 
-        attack_dice_results = sorted([simulate_dice_roll() for _ in range(attack_dice_rolls)], reverse=True)
-        defence_dice_results = sorted([simulate_dice_roll() for _ in range(defence_dice_rolls)], reverse=True)
+        attack_dice_results = self.dice.roll_dice(attack_dice_rolls)
+        defence_dice_results = self.dice.roll_dice(defence_dice_rolls)
 
         attack_wins = 0
         defence_wins = 0
@@ -545,25 +567,22 @@ class RiskGame:
                 defence_wins += 1
 
         if attack_wins > defence_wins:
-            pre_attack = defending_troop.number
-            defending_troop.number = max(0, pre_attack - attack_wins)
+            pre_attack = self.state.get_troops(defending)
+            self.state.set_troops(defending, max(0, pre_attack - attack_wins))
             print(
                 f"ATTACK SUCCESS. ATTACKER: {attack_color} DEFENDER: {defence_color}  {territory_attacking} vs. "
                 f"{territory_defending} DEFENDER LOSES {attack_wins} TROOPS")
 
-            if defending_troop.number == 0:
-                self.TERRITORIES_OWNED[defence_color].remove(territory_defending)
-                self.TERRITORIES_OWNED[attack_color].append(territory_defending)
-
-                defending_troop.color = attack_color
-                defending_troop.number = attack_wins
-                self._troops_on_board[territory_attacking][attack_color_index].number -= attack_wins
+            if self.state.get_troops(defending) == 0:
+                self._set_territory_owner(defending, attack_color)
+                self.state.set_troops(defending, attack_wins)
+                self.state.add_troops(attacking, -attack_wins)
                 print(f"CLAIM ALERT: ATTACKER: {attack_color} claimed {territory_defending}")
 
             return 1
         else:
-            pre_attack = attack_troop.number
-            attack_troop.number = max(0, pre_attack - defence_wins)
+            pre_attack = self.state.get_troops(attacking)
+            self.state.set_troops(attacking, max(0, pre_attack - defence_wins))
 
             print(
                 f"DEFENCE SUCCESS. ATTACKER: {attack_color} DEFENDER: {defence_color}  {territory_attacking} vs. "
@@ -573,36 +592,36 @@ class RiskGame:
 
     def _attack(self, color):
         attackable_territories = []
-        color_index = get_color_index(color)
 
         for territory in self.TERRITORIES_OWNED[color]:
-            neighbors = self.territory_attack_map[territory]
-
-            if self._troops_on_board[territory][color_index].number < 2:
+            if self.state.get_troops(territory) < 2:
                 continue
 
-            for neighbor in neighbors:
+            for neighbor in NEIGHBORS[territory]:
                 attackable_territories.append((neighbor, territory))
 
         while True:
-            territory_to_attack, territory_attacking = random.choice(attackable_territories)
+            territory_to_attack, territory_attacking = self.rng.choice(attackable_territories)
             opposing_color = self._find_owner_of_territory(territory_to_attack)
 
-            if self._troops_on_board[territory_attacking][color_index].number < 2:
-                territory_to_attack, territory_attacking = random.choice(attackable_territories)
+            if self.state.get_troops(territory_attacking) < 2:
+                territory_to_attack, territory_attacking = self.rng.choice(attackable_territories)
                 opposing_color = self._find_owner_of_territory(territory_to_attack)
                 continue
 
             result = self._run_attack_sequence(color, opposing_color, territory_attacking, territory_to_attack)
-            self.draw()
-            time.sleep(1)
+            if self.view is not None:
+                self.draw()
+                time.sleep(1)
             self._kill_highlights(color)
 
             if result == 0:
                 break
 
     def _fortify_territory(self, t1, t2, troops):
-        if t2 not in self.territory_attack_map[t1]:
+        t1, t2 = TERRITORY_INDEX[t1], TERRITORY_INDEX[t2]
+
+        if not is_adjacent(t1, t2):
             return
 
         territory_number = self._get_troop_count_from_territory(t2)
@@ -610,15 +629,14 @@ class RiskGame:
         if troops > territory_number - 1:
             return
 
-        troop = self._get_troop_from_territory(t1)
-        troop2 = self._get_troop_from_territory(t2)
+        self.state.add_troops(t1, troops)
+        self.state.add_troops(t2, -troops)
 
-        troop.number += troops
-        troop2.number -= troops
-
-    def _ucb(self, color, child, node, N, n):
+    def _ucb(self, color, child, node, N, n, virtual_loss=0):
         c = 1.5
-        X = self.evaluate_game_state(child[1].data[1], child[1].data[0], color)
+        # the child's static evaluation was computed when it joined the tree, less the virtual loss of selections
+        # through it that are still waiting for their evaluation
+        X = child[1].get_value() - self.VIRTUAL_LOSS * virtual_loss
 
         # default UCB value
         if N == 0:
@@ -626,96 +644,110 @@ class RiskGame:
 
         return X + c * sqrt(log(N) / n)
 
-    def _simulate_game(self, color, node):
-        wins, total = 0, 0
-        while not node.is_terminal(color):
-            # Select a random child
-            child = random.choice(node.children)
-            child = child[1]
-            # Check if the child has any children, and treat it as a terminal state if it does not
-            if not child.children:
-                if child.is_winning(color):
-                    return math.inf, 1
-                else:
-                    return self.evaluate_game_state(child.data[1], child.data[0], color), 1
-            # Play out the remainder of the game using a random policy
-            while not child.is_terminal():
-                child = random.choice(child.children)
-            # Check if a winning state has been reached, and return math.inf if so
-            if child.is_winning(color):
-                return math.inf, 1
-            # Update the wins and total counts
-            total += 1
-            if child.is_terminal():
-                if child.is_winning(color):
-                    return math.inf, total + 1
+    def _simulate_game(self, color, node, playouts):
+        # plays the game on from the node's position, the other colors moving next, and scores it for color
+        color_index = get_color_index(color)
+
+        winner = node.data.get_winner()
+        if winner is not None:
+            return (math.inf if winner == color_index else node.get_value()), 1
+
+        rewards = playouts.run(node.data, color_index, (color_index + 1) % len(COLORS), self.PLAYOUTS_PER_SIMULATION)
+
+        return sum(rewards), len(rewards)
+
+    def _traverse_tree(self, color, node, virtual_losses=None, widening=None):
+        # with virtual_losses (node -> selections in flight), every node the descent passes is charged one; with
+        # widening, a node passed releases the candidates its visit count now allows before one of its children is
+        # chosen. The node the descent starts from is counted as visited too, so the root's count (and with it the
+        # exploration term and the widening limit below it) grows with every descent. Exhausted children (see
+        # TreeNode) are passed by: once a node's other children are all exhausted it releases its next candidate
+        # early, and only then is its fortify child followed
+        node.num_visits += 1
+        while node.has_children():
+            if widening is not None and node.has_candidates():
+                node.widen(get_widening_limit(widening, node.num_visits))
+
+            # fortify edges end the turn, selection only looks at the other groups
+            non_fortify_children = [pair for pair in node.get_non_fortify_children() if not pair[1].exhausted]
+            child_node = next((child for _, child in non_fortify_children if child.num_visits == 0), None)
+            if child_node is None:
+                # an unbuilt child is built on its first selection, before the visit lands on its statistics
+                position = self._find_unbuilt_child(node, fortify=False)
+                if position is not None:
+                    child_node = node.build_child(position)
+
+            if child_node is not None:
+                child_node.num_visits += 1  # Increment num_visits for the child node
+                if virtual_losses is not None:
+                    virtual_losses[child_node] = virtual_losses.get(child_node, 0) + 1
+                return child_node, child_node.num_visits
+            elif non_fortify_children:
+                if virtual_losses is None:
+                    ucb_scores = [self._ucb(color, child, node, node.num_visits, child[1].num_visits) for child in
+                                  non_fortify_children]
                 else:
-                    return self.evaluate_game_state(child.data[1], child.data[0], color), total + 1
-
-        return self.evaluate_game_state(node.data[1], node.data[0], color), total
-
-    def _traverse_tree(self, color, node):
-        while node.children:
-            non_fortify_children = [child for child in node.children if child[0].data["type"] != "f"]
-            unexplored_children = [child for child in non_fortify_children if child[1].num_visits == 0]
-            if len(unexplored_children) > 0:
-                child_node = unexplored_children[0]
-                child_node[1].num_visits += 1  # Increment num_visits for the child node
-                return child_node[1], child_node[1].num_visits
+                    ucb_scores = [self._ucb(color, child, node, node.num_visits, child[1].num_visits,
+                                            virtual_losses.get(child[1], 0)) for child in non_fortify_children]
+
+                node = non_fortify_children[np.argmax(ucb_scores)][1]
+            elif node.has_candidates():
+                node.release_candidate()
+                continue
+            elif node.children and get_action_kind(node.children[-1][0].data) == FORTIFY and \
+                    not node.children[-1][1].exhausted:
+                # only the fortify child is left
+                node = node.children[-1][1]
             else:
-                ucb_scores = [self._ucb(color, child, node, node.num_visits, child[1].num_visits) for child in
-                              non_fortify_children]
-                # print([edge.data["type"] for edge, _ in non_fortify_children],
-                #       [edge.data["type"] for edge, _ in node.children])
-                if len(ucb_scores) == 0 and len(node.children) == 1:
-                    best_child = node.children[0]
-                else:
-                    best_child = non_fortify_children[np.argmax(ucb_scores)]
+                position = self._find_unbuilt_child(node, fortify=True)
+                if position is None:
+                    # nothing left below a node not yet marked exhausted, it is returned to be marked
+                    return node, node.num_visits
+                node = node.build_child(position)
 
-                node = best_child[1]
-                node.num_visits += 1  # Increment num_visits for the selected node
+            node.num_visits += 1  # Increment num_visits for the selected node
+            if virtual_losses is not None:
+                virtual_losses[node] = virtual_losses.get(node, 0) + 1
 
         return node, node.num_visits
 
-    def _sort_territory_neighbors(self, territory, gamestate):
+    @staticmethod
+    def _find_unbuilt_child(node, fortify):
+        # position of node's first unbuilt fortify (or other) child, None when it has none
+        return next((position for position, (action, _) in enumerate(node.unbuilt_children)
+                     if (get_action_kind(action) == FORTIFY) == fortify), None)
+
+    def _sort_territory_neighbors(self, territory, state):
         territory_neighbors = {}
 
-        for t in self.territory_attack_map[territory]:
-            territory_neighbors[t] = self._get_troop_count_from_territory(t, gamestate)
+        for t in NEIGHBORS[territory]:
+            territory_neighbors[t] = state.get_troops(t)
 
         return dict(sorted(territory_neighbors.items(), key=lambda entry: entry[1]))
 
-    def _reinforce_weak_territories(self, color, troops, gamestate, territories_in_gs,
-                                    weak_territory_count):
-        color_idx = get_color_index(color)
-        weak_territories = [t for t in gamestate if self._get_troop_count_from_territory(t, gamestate) < 2]
-        weak_territories = sorted(weak_territories,
-                                  key=lambda t: self._get_troop_count_from_territory(t, gamestate))
-        weak_territories_dict = {t: self._get_troop_count_from_territory(t, gamestate) for t in weak_territories}
+    def _reinforce_weak_territories(self, color, troops, state, weak_territory_count):
+        weak_territories = [t for t in state.get_territories(get_color_index(color)) if state.get_troops(t) < 2]
+        weak_territories = sorted(weak_territories, key=lambda t: state.get_troops(t))
+        weak_territories_dict = {t: state.get_troops(t) for t in weak_territories}
         allocated_troops = allocate_troops(troops, weak_territories_dict)
 
         for territory, troops_to_add in allocated_troops.items():
-            gamestate[territory][color_idx].number += troops_to_add
+            state.add_troops(territory, troops_to_add)
 
-        return gamestate, allocated_troops
+        return state, allocated_troops
 
-    def _reinforce_owned_key_territories(self, color, troops, gamestate, territories_in_gs,
-                                         key_territory_percentage,
-                                         fallback_count):
-        key_territories = get_key_territories()
+    def _reinforce_owned_key_territories(self, color, troops, state, key_territory_percentage, fallback_count):
+        key_territories = KEY_TERRITORIES
 
-        color_idx = get_color_index(color)
-        owned_key_territories = [t for t in territories_in_gs[color] if t in key_territories]
+        territories_owned = state.get_territories(get_color_index(color))
+        owned_key_territories = [t for t in territories_owned if t in key_territories]
 
         if len(owned_key_territories) == 0:
-            return self._reinforce_weak_territories(color, troops, gamestate, territories_in_gs, fallback_count)
+            return self._reinforce_weak_territories(color, troops, state, fallback_count)
 
-
-        weak_territories = [t for t in gamestate if self._get_troop_count_from_territory(t, gamestate) < 3 and t in
-                            territories_in_gs[color]]
-        weak_territories = sorted(weak_territories,
-                                  key=lambda t: self._get_troop_count_from_territory(t, gamestate))
-        weak_territories_dict = {t: self._get_troop_count_from_territory(t, gamestate) for t in weak_territories}
+        weak_territories = [t for t in territories_owned if state.get_troops(t) < 3]
+        weak_territories = sorted(weak_territories, key=lambda t: state.get_troops(t))
+        weak_territories_dict = {t: state.get_troops(t) for t in weak_territories}
 
         troops_on_key_territories = math.floor(key_territory_percentage * troops)
         troops_on_weak_territories = troops - troops_on_key_territories
@@ -723,115 +755,124 @@ class RiskGame:
         key_territory_split = troops_on_key_territories // len(key_territories)
 
         for territory in owned_key_territories:
-            gamestate[territory][color_idx].number += key_territory_split
+            state.add_troops(territory, key_territory_split)
 
         allocated_troops = allocate_troops(troops_on_weak_territories, weak_territories_dict)
 
         for territory, troops_to_add in allocated_troops.items():
-            gamestate[territory][color_idx].number += troops_to_add
-
-        return gamestate, allocated_troops
+            state.add_troops(territory, troops_to_add)
 
-    def _reinforce_attacked_territories(self, color, troops, gamestate, territories_in_gs,
-                                        attacked_territory_percentage, attack_count_in_gs,
-                                        fallback_count):
-        territories_owned_attack_counts = {t: attack_count_in_gs[t] for t in territories_in_gs[color] if
-                                           attack_count_in_gs[t] > 0}
+        return state, allocated_troops
 
-        color_idx = get_color_index(color)
+    def _reinforce_attacked_territories(self, color, troops, state, attacked_territory_percentage, fallback_count):
+        territories_owned_attack_counts = {t: state.get_attack_count(t) for t in
+                                           state.get_territories(get_color_index(color))
+                                           if state.get_attack_count(t) > 0}
 
         if len(territories_owned_attack_counts) == 0:
-            return self._reinforce_weak_territories(color, troops, gamestate, territories_in_gs, fallback_count)
+            return self._reinforce_weak_territories(color, troops, state, fallback_count)
 
         allocated_troops = allocate_troops_by_attacks(territories_owned_attack_counts, troops)
 
         for territory, troops_to_add in allocated_troops.items():
-            gamestate[territory][color_idx].number += troops_to_add
+            state.add_troops(territory, troops_to_add)
 
-        return gamestate, allocated_troops
+        return state, allocated_troops
 
-    # for attacking strategies, to keep the search tree limited, a maximum of 12 attacks are added
-    def _aggressive_attack(self, selected_node, color, gamestate, territories_in_gs, attack_count_in_gs,
-                           territories_owned_sorted_by_troops_max):
+    def _add_attack_child(self, selected_node, color, attacking_territory, defending_territory, state):
+        selected_node.add_unbuilt_child(*self._get_attack_child(color, attacking_territory, defending_territory, state))
 
-        # get the top 4 territories with the most troops on them as these are great for attacking
-        for territory in territories_owned_sorted_by_troops_max[:5]:
-            # get the top 3 territories with the least troops on them that are neighbors of one of
-            # the top 4 territories
-            sorted_attackable_territories = self._sort_territory_neighbors(territory, gamestate)
-            attack_troops = self._get_troop_count_from_territory(territory, gamestate)
+        return selected_node
 
-            i = 0
-            for defence_territory in sorted_attackable_territories:
-                if i == 4:
-                    break
-                defence_troops = self._get_troop_count_from_territory(defence_territory, gamestate)
-                prob = calculate_attack_success_probability(attack_troops, defence_troops)
+    def _get_attack_child(self, color, attacking_territory, defending_territory, state):
+        # only the action is worked out here (the outcome lookup is cached), the child's state is built when the
+        # search first selects it
+        win, _, _ = get_attack_outcome(state.get_troops(attacking_territory), state.get_troops(defending_territory))
+
+        return encode_action(ATTACK, attacking_territory, defending_territory, won=win), \
+            partial(self._build_attack_child, color, attacking_territory, defending_territory)
+
+    def _get_attack_candidates(self, color, state):
+        # every attack color can make, from a territory with more than one army on a neighbor held by another color,
+        # most likely to succeed first: the order progressive widening adds them in
+        color_idx = get_color_index(color)
+        attacks = []
 
-                # calculate how many attack and defence troops lost based on the probability of an
-                # attack success
+        for attacking_territory in state.get_territories(color_idx):
+            attack_troops = state.get_troops(attacking_territory)
+            if attack_troops < 2:
+                continue
 
-                new_gamestate = deepcopy(gamestate)
-                new_territories_owned = deepcopy(territories_in_gs)
-                new_attacks = deepcopy(attack_count_in_gs)
+            for defending_territory in NEIGHBORS[attacking_territory]:
+                if state.get_owner(defending_territory) in (color_idx, NO_OWNER):
+                    continue
 
-                attacking_count = self._get_troop_count_from_territory(territory, gamestate)
-                defending_count = self._get_troop_count_from_territory(defence_territory, gamestate)
-                win = False
+                win_probability = attack_win_probability(attack_troops, state.get_troops(defending_territory))
+                attacks.append((win_probability, attacking_territory, defending_territory))
 
-                if prob > 0.5:
-                    attacking_troops_lost = int(round(attacking_count * (1 - prob)))
-                    defending_troops_lost = defending_count
-                    win = True
-                else:
-                    attacking_troops_lost = attacking_count - 1
-                    defending_troops_lost = int(round(defending_count * (1 - prob)))
+        attacks.sort(key=lambda attack: attack[0], reverse=True)
 
-                ocolor = find_owner_of_territory_in_gamestate(defence_territory, new_territories_owned)
+        return [self._get_attack_child(color, attacking_territory, defending_territory, state)
+                for _, attacking_territory, defending_territory in attacks]
 
-                color_idx = get_color_index(color)
-                ocolor_idx = get_color_index(ocolor)
+    def _build_attack_child(self, color, attacking_territory, defending_territory, state):
+        attack_troops = state.get_troops(attacking_territory)
+        defence_troops = state.get_troops(defending_territory)
 
-                if win:
-                    new_gamestate[territory][color_idx].number -= attacking_troops_lost + 1
-                    new_gamestate[defence_territory][ocolor_idx].number = 1
-                else:
-                    new_gamestate[defence_territory][ocolor_idx].number -= defending_troops_lost
-                    new_gamestate[territory][color_idx].number = 1
+        # the child takes the most likely end state of the battle, on whichever side (capture or hold) is more
+        # likely, straight from the battle outcome distribution
+        win, attackers_left, defenders_left = get_attack_outcome(attack_troops, defence_troops)
 
-                if win:
-                    new_territories_owned[color].append(defence_territory)
-                    new_territories_owned[ocolor].remove(defence_territory)
+        new_state = state.copy()
 
-                new_attacks[defence_territory] += 1
+        if win:
+            # one army moves into the captured territory, the rest can follow with an "ap" action
+            new_state.set_troops(attacking_territory, attackers_left - 1)
+            new_state.set_owner(defending_territory, get_color_index(color))
+            new_state.set_troops(defending_territory, 1)
+        else:
+            new_state.set_troops(attacking_territory, attackers_left)
+            new_state.set_troops(defending_territory, defenders_left)
 
-                selected_node.add_child(
-                    TreeNode([new_territories_owned, new_gamestate, new_attacks]),
-                    {"type": "a", "won": win, "attacking_territory":
-                        territory, "defending_territory": defence_territory},
-                )
+        new_state.add_attack(defending_territory)
+
+        return new_state, encode_action(ATTACK, attacking_territory, defending_territory, won=win)
+
+    # for attacking strategies, to keep the search tree limited, a maximum of MAX_STRATEGY_ATTACKS attacks are added
+    # (unless the search widens progressively, see _get_attack_candidates)
+    def _aggressive_attack(self, selected_node, color, state, territories_owned_sorted_by_troops_max):
+
+        # get the top 4 territories with the most troops on them as these are great for attacking
+        for territory in territories_owned_sorted_by_troops_max[:AGGRESSIVE_ATTACK_SOURCES]:
+            # get the top 3 territories with the least troops on them that are neighbors of one of
+            # the top 4 territories
+            sorted_attackable_territories = self._sort_territory_neighbors(territory, state)
+
+            i = 0
+            for defence_territory in sorted_attackable_territories:
+                if i == AGGRESSIVE_ATTACKS_PER_SOURCE:
+                    break
+
+                self._add_attack_child(selected_node, color, territory, defence_territory, state)
 
                 i += 1
 
         return selected_node
 
-    def _guerilla_style_attack(self, color, selected_node, gamestate, territories_in_gs, attack_count_in_gs):
-        territories_owned_by_others = [t for c, t in territories_in_gs.items() if color != c]
-        territories_not_owned = []
-
-        for a in territories_owned_by_others:
-            for b in a:
-                territories_not_owned.append(b)
+    def _guerilla_style_attack(self, color, selected_node, state):
+        color_idx = get_color_index(color)
+        territories_not_owned = [t for t, owner in enumerate(state.owner.tolist())
+                                 if owner not in (color_idx, NO_OWNER)]
 
-        weakest_territories = {t: self._get_troop_count_from_territory(t, gamestate) for t in territories_not_owned}
+        weakest_territories = {t: state.get_troops(t) for t in territories_not_owned}
         weakest_territories = dict(sorted(weakest_territories.items(), key=lambda entry: entry[1]))
 
         attackable_weak_territories = {}
-        territories_owned = set(territories_in_gs[color])
+        territories_owned = set(state.get_territories(color_idx))
 
         # add territory to attack with to dictionary
         for k in weakest_territories:
-            neighbors_of_weak_territory = set(self.territory_attack_map[k])
+            neighbors_of_weak_territory = set(NEIGHBORS[k])
             territory_to_attack_with = territories_owned.intersection(neighbors_of_weak_territory)
 
             if len(territory_to_attack_with) == 0:
@@ -840,12 +881,11 @@ class RiskGame:
                 territory_to_attack_with = list(territory_to_attack_with)[0]
             else:
                 # if there are more territories that can attack, choose the one with the highest # of troops
-                index = np.argmax(
-                    [self._get_troop_count_from_territory(t, gamestate) for t in territory_to_attack_with])
+                index = np.argmax([state.get_troops(t) for t in territory_to_attack_with])
                 territory_to_attack_with = list(territory_to_attack_with)[index]
 
-            troops_on_weak_territory = self._get_troop_count_from_territory(k, gamestate)
-            troops_on_territory_attacking = self._get_troop_count_from_territory(territory_to_attack_with, gamestate)
+            troops_on_weak_territory = state.get_troops(k)
+            troops_on_territory_attacking = state.get_troops(territory_to_attack_with)
 
             # only attack weak territories if we can attack with more die
             if troops_on_territory_attacking - 1 <= troops_on_weak_territory:
@@ -853,73 +893,31 @@ class RiskGame:
 
             attackable_weak_territories[k] = territory_to_attack_with
 
-        # as mentioned above attacks are limited to 12 for search tree performance
+        # as mentioned above attacks are limited to MAX_STRATEGY_ATTACKS for search tree performance
         i = 0
         for defence_territory, territory_to_attack_with in attackable_weak_territories.items():
-            if i == 12:
+            if i == MAX_STRATEGY_ATTACKS:
                 break
 
-            new_gamestate = deepcopy(gamestate)
-            new_territories_owned = deepcopy(territories_in_gs)
-            new_attacks = deepcopy(attack_count_in_gs)
-
-            win = False
-            attack_troops = self._get_troop_count_from_territory(territory_to_attack_with, new_gamestate)
-            defence_troops = self._get_troop_count_from_territory(defence_territory, new_gamestate)
-
-            prob = calculate_attack_success_probability(attack_troops, defence_troops)
-
-            if prob > 0.5:
-                attacking_troops_lost = int(round(attack_troops * (1 - prob)))
-                defending_troops_lost = defence_troops
-                win = True
-            else:
-                attacking_troops_lost = attack_troops - 1
-                defending_troops_lost = int(round(defence_troops * (1 - prob)))
-
-            ocolor = find_owner_of_territory_in_gamestate(defence_territory, new_territories_owned)
-
-            color_idx = get_color_index(color)
-            ocolor_idx = get_color_index(ocolor)
-
-            if win:
-                new_gamestate[territory_to_attack_with][color_idx].number -= attacking_troops_lost + 1
-                new_gamestate[defence_territory][ocolor_idx].number = 1
-            else:
-                new_gamestate[defence_territory][ocolor_idx].number -= defending_troops_lost
-                new_gamestate[territory_to_attack_with][color_idx].number = 1
-
-            if win:
-                new_territories_owned[color].append(defence_territory)
-                new_territories_owned[ocolor].remove(defence_territory)
-
-            new_attacks[defence_territory] += 1
-
-            selected_node.add_child(
-                TreeNode([new_territories_owned, new_gamestate, new_attacks]),
-                {"type": "a", "attacking_territory": territory_to_attack_with,
-                 "won": win,
-                 "defending_territory": defence_territory},
-            )
+            self._add_attack_child(selected_node, color, territory_to_attack_with, defence_territory, state)
 
             i += 1
 
         return selected_node
 
-    def _blitz_attack(self, color, selected_node, gamestate, territories_in_gs, attack_count_in_gs):
+    def _blitz_attack(self, color, selected_node, state):
         # this attacking strategy prioritizes attacking weak "key" territories to gain a strategic advantage
-        key_territories = get_key_territories()
+        key_territories = KEY_TERRITORIES
 
-        sorted_key_territories = sorted(key_territories,
-                                        key=lambda t: self._get_troop_count_from_territory(t, gamestate))
+        sorted_key_territories = sorted(key_territories, key=lambda t: state.get_troops(t))
         attackable_key_territories = {}
-        owned_territories = set(territories_in_gs[color])
+        owned_territories = set(state.get_territories(get_color_index(color)))
 
         for territory in sorted_key_territories:
             if territory not in owned_territories:
                 continue
 
-            neighbors_of_territory = set(self.territory_attack_map[territory])
+            neighbors_of_territory = set(NEIGHBORS[territory])
 
             territory_to_attack_with = neighbors_of_territory.intersection(owned_territories)
 
@@ -928,11 +926,11 @@ class RiskGame:
             elif len(territory_to_attack_with) == 1:
                 territory_to_attack_with = list(territory_to_attack_with)[0]
             else:
-                index = np.argmax([t for t in territory_to_attack_with])
+                index = np.argmax([state.get_troops(t) for t in territory_to_attack_with])
                 territory_to_attack_with = list(territory_to_attack_with)[index]
 
-            troops_on_weak_territory = self._get_troop_count_from_territory(territory, gamestate)
-            troops_on_attacking_territory = self._get_troop_count_from_territory(territory_to_attack_with, gamestate)
+            troops_on_weak_territory = state.get_troops(territory)
+            troops_on_attacking_territory = state.get_troops(territory_to_attack_with)
 
             if troops_on_weak_territory == 0:
                 continue
@@ -943,73 +941,28 @@ class RiskGame:
             if troops_on_attacking_territory - 1 <= troops_on_weak_territory:
                 continue
 
-
-
             attackable_key_territories[territory] = territory_to_attack_with
 
         i = 0
         for defence_territory, territory_to_attack_with in attackable_key_territories.items():
-            if i == 12:
+            if i == MAX_STRATEGY_ATTACKS:
                 break
 
-            new_gamestate = deepcopy(gamestate)
-            new_territories_owned = deepcopy(territories_in_gs)
-            new_attacks = deepcopy(attack_count_in_gs)
-
-            win = False
-            attack_troops = self._get_troop_count_from_territory(territory_to_attack_with, new_gamestate)
-            defence_troops = self._get_troop_count_from_territory(defence_territory, new_gamestate)
-
-            prob = calculate_attack_success_probability(attack_troops, defence_troops)
-
-            if prob > 0.5:
-                attacking_troops_lost = int(round(attack_troops * (1 - prob)))
-                defending_troops_lost = defence_troops
-                win = True
-            else:
-                attacking_troops_lost = attack_troops - 1
-                defending_troops_lost = int(round(defence_troops * (1 - prob)))
-
-            ocolor = find_owner_of_territory_in_gamestate(defence_territory, new_territories_owned)
-
-            color_idx = get_color_index(color)
-            ocolor_idx = get_color_index(ocolor)
-
-            if win:
-                new_gamestate[territory_to_attack_with][color_idx].number -= attacking_troops_lost + 1
-                new_gamestate[defence_territory][ocolor_idx].number = 1
-            else:
-                new_gamestate[defence_territory][ocolor_idx].number -= defending_troops_lost
-                new_gamestate[territory_to_attack_with][color_idx].number = 1
-
-            #print(new_gamestate[territory_to_attack_with][color_idx].number, new_gamestate[defence_territory][ocolor_idx].number)
-
-            if win:
-                new_territories_owned[color].append(defence_territory)
-                new_territories_owned[ocolor].remove(defence_territory)
-
-            new_attacks[defence_territory] += 1
-
-            selected_node.add_child(
-                TreeNode([new_territories_owned, new_gamestate, new_attacks]),
-                {"type": "a", "attacking_territory": territory_to_attack_with,
-                 "won": win,
-                 "defending_territory": defence_territory},
-            )
+            self._add_attack_child(selected_node, color, territory_to_attack_with, defence_territory, state)
 
             i += 1
 
         return selected_node
 
-    def _transfer_troops(self, color, territory_attacking, territory_won, gamestate, territories_in_gs,
-                         attack_count_in_gs,
+    def _transfer_troops(self, color, territory_attacking, territory_won, state,
                          re_attack_weight, isolation_weight,
                          key_territory_weight):
-        all_neighbors = self.territory_attack_map[territory_won]
-        owned_neighbors = [t for t in all_neighbors if t in territories_in_gs[color]]
-        key_territories = get_key_territories()
+        all_neighbors = NEIGHBORS[territory_won]
+        color_idx = get_color_index(color)
+        owned_neighbors = [t for t in all_neighbors if state.get_owner(t) == color_idx]
+        key_territories = KEY_TERRITORIES
 
-        total_troops = self._get_troop_count_from_territory(territory_attacking, gamestate)
+        total_troops = state.get_troops(territory_attacking)
 
         isolation = len(owned_neighbors) / len(all_neighbors)
 
@@ -1018,36 +971,36 @@ class RiskGame:
         if territory_won in key_territories:
             troops_to_add += key_territory_weight * total_troops
 
-        troops_to_add += attack_count_in_gs[territory_won] * re_attack_weight
+        troops_to_add += state.get_attack_count(territory_won) * re_attack_weight
 
         troops_to_add += isolation_weight * (total_troops * isolation)
 
-        new_gamestate = deepcopy(gamestate)
-        new_territories_owned = deepcopy(territories_in_gs)
-        new_attacks = deepcopy(attack_count_in_gs)
-
-        color_idx = get_color_index(color)
+        new_state = state.copy()
 
         if troops_to_add > total_troops:
             # if weights are not chosen correctly 1 troop will be added
             # this is to penalize incorrect selection of weights
-            new_gamestate[territory_attacking][color_idx].number -= 1
-            new_gamestate[territory_won][color_idx].number += 1
-            return
+            new_state.add_troops(territory_attacking, -1)
+            new_state.add_troops(territory_won, 1)
+            return new_state
 
-        new_gamestate[territory_attacking][color_idx].number -= troops_to_add
-        new_gamestate[territory_won][color_idx].number += troops_to_add
+        # troop counts are whole armies
+        troops_to_add = int(troops_to_add)
 
-        return new_gamestate, new_territories_owned, new_attacks
+        new_state.add_troops(territory_attacking, -troops_to_add)
+        new_state.add_troops(territory_won, troops_to_add)
 
-    def _fortify_weakest_territories(self, color, gamestate, territories_in_gs):
-        weakest_territories = {t: self._get_troop_count_from_territory(t, gamestate) for t in territories_in_gs[color]}
+        return new_state
+
+    def _fortify_weakest_territories(self, color, state):
+        territories_owned = set(state.get_territories(get_color_index(color)))
+        weakest_territories = {t: state.get_troops(t) for t in territories_owned}
         sorted_weakest_territories = dict(sorted(weakest_territories.items(), key=lambda x: x[1]))
 
-        get_allocation = lambda t: {x: self._get_troop_count_from_territory(x, gamestate) for x in
-                                    self.territory_attack_map[t] if x in territories_in_gs[color]}
-        get_total = lambda t: sum([self._get_troop_count_from_territory(x, gamestate) for x in
-                                   self.territory_attack_map[t] if x in territories_in_gs[color]])
+        get_allocation = lambda t: {x: state.get_troops(x) for x in
+                                    NEIGHBORS[t] if x in territories_owned}
+        get_total = lambda t: sum([state.get_troops(x) for x in
+                                   NEIGHBORS[t] if x in territories_owned])
 
         sorted_weakest_territories_with_allocation_limit = {
             k: {"troops": v, "total_troops": get_total(k), "neighbors": get_allocation(k)} for k, v in
@@ -1075,10 +1028,8 @@ class RiskGame:
 
         target_territories = dict(sorted(target_territories.items(), key=lambda x: x[1]["troops"]))
 
-        new_gamestate = deepcopy(gamestate)
-        new_territories = deepcopy(territories_in_gs)
+        new_state = state.copy()
 
-        color_idx = get_color_index(color)
         full_map = sorted_weakest_territories_with_allocation_limit
 
         for weak_territory, information in target_territories.items():
@@ -1087,180 +1038,350 @@ class RiskGame:
 
             for t, transfer in result.items():
                 if transfer > 0:
-                    if new_gamestate[t][color_idx].number - transfer < 0:
-                        new_transfer = transfer - abs(new_gamestate[t][color_idx].number - transfer)
-                        new_gamestate[t][color_idx].number -= new_transfer
-                        new_gamestate[weak_territory][color_idx].number += new_transfer
+                    if new_state.get_troops(t) - transfer < 0:
+                        new_transfer = transfer - abs(new_state.get_troops(t) - transfer)
+                        new_state.add_troops(t, -new_transfer)
+                        new_state.add_troops(weak_territory, new_transfer)
                     else:
-                        new_gamestate[weak_territory][color_idx].number += transfer
-                        new_gamestate[t][color_idx].number -= transfer
-
-        return new_gamestate, new_territories
-
-    def find_best_move(self, color):
-        print(color)
-        moves = ["p", "a", "ap", "f"]
-        search_tree = Tree([deepcopy(self.TERRITORIES_OWNED), deepcopy(self._troops_on_board),
-                            deepcopy(self.TERRITORY_ATTACK_COUNT)])
+                        new_state.add_troops(weak_territory, transfer)
+                        new_state.add_troops(t, -transfer)
+
+        return new_state
+
+    def _create_game_state(self):
+        # the search expands copies, the live position only changes once a move is chosen
+        return self.state.copy()
+
+    def _apply_game_state(self, state):
+        self.state = state
+        self.TERRITORIES_OWNED = {color: state.get_territories(get_color_index(color))
+                                  for color in self.TERRITORIES_OWNED}
+        self._owned_positions = {territory: position for territories in self.TERRITORIES_OWNED.values()
+                                 for position, territory in enumerate(territories)}
+
+    def _get_position_context_key(self, color):
+        # the parts of a position a search does not change: the side to move and everyone's card hands
+        key = hash_side_to_move(get_color_index(color))
+        for c, cards in self.CARDS_OWNED.items():
+            key ^= hash_card_hand(get_color_index(c), cards)
+
+        return key
+
+    def _search(self, color, max_ms=None, max_iterations=None, max_nodes=None, batch_size=1, widening=None):
+        """
+        Builds the search tree for color's turn. Without a budget the search stops as it always has, once the tree
+        is `depth` layers deep or a fortify leaf is selected. With any of a wall-clock (milliseconds), iteration or
+        node budget it is an anytime search: it keeps iterating over the (depth limited) turn tree until the first
+        budget runs out, or until the turn tree has nothing left to expand. Budgets are checked between iterations;
+        the first iteration, which expands the root, always runs so there is a move to play.
+
+        With a batch_size above one each step selects up to that many distinct leaves, steering the later
+        selections away from the earlier ones with a virtual loss, expands them all, scores every new node with
+        one evaluate_game_states call and then backpropagates each leaf. Every selected leaf counts as an iteration.
+
+        widening, a (c, alpha) pair, replaces the attack strategy's fixed caps with progressive widening: every attack
+        is a candidate, ranked by its odds of success, and a node visited N times has at most max(1, c * N ** alpha)
+        of them as children. A node whose children are all exhausted releases its next candidate straight away.
+        """
+        moves = [PLACE, ATTACK, ADVANCE, FORTIFY]
+        self.transposition_table = TranspositionTable(self.TRANSPOSITION_TABLE_SIZE)
+        evaluate_batch = None if batch_size <= 1 else lambda states: self.evaluate_game_states(states, color)
+        search_tree = Tree(self._create_game_state(), self._get_position_context_key(color),
+                           self.transposition_table, lambda state: self.evaluate_game_state(state, color),
+                           evaluate_batch)
+
+        playouts = PlayoutEngine(lambda states: self.evaluate_game_states(states, color), self.PLAYOUT_HORIZON,
+                                 self.PLAYOUT_POLICY, self.PLAYOUT_MAX_ATTACKS, self.rng)
         depth = 4
-        selected_node = None
+
+        budgeted = max_ms is not None or max_iterations is not None or max_nodes is not None
+        deadline = None if max_ms is None else time.perf_counter() + max_ms / 1000
+        cpu_start = time.process_time()
 
         i = 0
         while True:
             tree_depth = search_tree.get_num_layers()
 
-            if tree_depth == depth:
+            if search_tree.get_root().exhausted:
+                # the turn tree is fully grown: every leaf selection could reach expanded into nothing
+                break
+            elif budgeted:
+                if i > 0 and self._is_search_budget_spent(search_tree, i, deadline, max_iterations, max_nodes):
+                    break
+            elif tree_depth == depth:
                 break
 
             # selection step
-            if tree_depth == 1:
-                selected_node = search_tree.get_root()
+            if not search_tree.get_root().has_children():
+                selected_nodes = [search_tree.get_root()]
+            elif batch_size <= 1:
+                selected_nodes = [self._traverse_tree(color, search_tree.get_root(), widening=widening)[0]]
             else:
-                selected_node, total_actions_taken = self._traverse_tree(color, search_tree.get_root())
-
-            # expansion step
-            possible_actions = moves
-            edge_to_parent = None
-
-            if selected_node.parent:
-                edge_to_parent = selected_node.parent.get_edge_to_child(selected_node)
-
-            previous_action_data = None if selected_node.parent is None else edge_to_parent.data
-            previous_action = None if previous_action_data is None else previous_action_data["type"]
-
-            # force fortification if depth about to be reached
-            if tree_depth == depth - 1 and previous_action != "f":
-                possible_actions = ["f"]
-
-            if "p" in possible_actions and previous_action == "a":
-                possible_actions.remove("p")
-            elif previous_action == "f":
-                possible_actions = []
-            elif "ap" in possible_actions:
-                possible_actions.remove("ap")
-
-            # if action taken previously, then remove (except for attack)
-            if previous_action != "a" and previous_action in possible_actions:
-                possible_actions.remove(previous_action)
-
-            gamestate = selected_node.data[1]
-            territories_owned_in_gamestate = selected_node.data[0]
-            attack_counts = selected_node.data[2]
-
-            territories_owned_sorted_by_troops_max = sorted(territories_owned_in_gamestate[color], reverse=True,
-                                                            key=lambda t:
-                                                            self._get_troop_count_from_territory(t, gamestate))
-            for action in possible_actions:
-                if action == "a":
-                    selected_node = self._blitz_attack(
-                        color, selected_node, gamestate,
-                        territories_owned_in_gamestate,
-                        attack_counts,
-                    )
-
-                elif action == "p":
-                    troops_by_territories = min(3, len(territories_owned_in_gamestate[color]) // 3)
-                    troops_by_continent = self._get_continent_owned_bonus(color, territories_owned_in_gamestate)
-                    troops_by_card = self._get_card_trade_bonus(color, territories_owned_in_gamestate)
-                    total_troops = troops_by_territories + troops_by_continent + troops_by_card
-
-                    new_gamestate = deepcopy(gamestate)
-                    new_territories_owned = deepcopy(territories_owned_in_gamestate)
-                    new_attacks = deepcopy(attack_counts)
-
-                    # new_gamestate = \
-                    #      self._reinforce_weak_territories(color, total_troops, new_gamestate,
-                    #                                       territories_owned_in_gamestate, 3)
-                    new_gamestate, allocated_troops = \
-                        self._reinforce_owned_key_territories(color, total_troops, new_gamestate,
-                                                              territories_owned_in_gamestate, 0.6, 3)
-                    # new_gamestate = self._reinforce_attacked_territories(color, total_troops, new_gamestate,
-                    #                                                      territories_owned_in_gamestate, 0.4, 3)
-
-                    selected_node.add_child(
-                        TreeNode([new_territories_owned, new_gamestate, new_attacks]),
-                        {"type": "p", "territories_changed": {k: v for k, v in allocated_troops.items() if v > 0},
-                         "troops": total_troops}
-                    )
-
-                elif action == "ap":
-                    if not previous_action_data["won"]:
-                        continue
-
-                    attacking_territory = previous_action_data["attacking_territory"]
-                    territory_won = previous_action_data["defending_territory"]
-
-                    troops_on_attacking_territory = self._get_troop_count_from_territory(attacking_territory, gamestate)
-                    troops_on_territory_won = self._get_troop_count_from_territory(territory_won, gamestate)
-
-                    new_gamestate, new_territories_owned, new_attacks = \
-                        self._transfer_troops(color, attacking_territory,
-                                              territory_won,
-                                              gamestate,
-                                              territories_owned_in_gamestate,
-                                              attack_counts, 0.1, 0.1,
-                                              0.1)
-
-                    selected_node.add_child(
-                        TreeNode([new_territories_owned, new_gamestate, new_attacks]),
-                        {"type": "ap"},
-                    )
-
+                selected_nodes = self._select_leaves(color, search_tree.get_root(), batch_size, widening)
+
+            i += len(selected_nodes)
+
+            # expansion step; a leaf that expands into nothing (a fortify child, or one at the depth limit) is
+            # exhausted, and selection leaves it out from now on
+            expansions = []
+            for selected_node in selected_nodes:
+                # each expansion narrows its own copy of the moves
+                expansions.append(self._expand_node(color, selected_node, list(moves), depth, widening))
+                selected_node.mark_exhausted()
+
+            # the new nodes of the whole batch are scored together
+            if evaluate_batch is not None:
+                search_tree.evaluate_pending()
+
+            fortified = False
+            results = []
+            for selected_node, (possible_actions, edge_to_parent) in zip(selected_nodes, expansions):
+                # simulation step
+                if len(possible_actions) == 0 or not selected_node.has_children():
+                    reward = selected_node.get_value()
+                    total = 0
                 else:
-                    new_gamestate, new_territories = \
-                        self._fortify_weakest_territories(color, gamestate,
-                                                          territories_owned_in_gamestate)
+                    reward, total = self._simulate_game(color, selected_node, playouts)
 
-                    new_attacks = deepcopy(attack_counts)
+                results.append((selected_node, reward, total))
 
-                    selected_node.add_child(
-                        TreeNode([new_territories, new_gamestate, new_attacks]),
-                        {"type": "f"},
-                    )
+                if edge_to_parent and get_action_kind(edge_to_parent.data) == FORTIFY:
+                    fortified = True
 
-            # simulation step
-            if len(possible_actions) == 0:
-                reward = self.evaluate_game_state(selected_node.data[1], selected_node.data[0], color)
-                total = 0
+            # backpropagate, the paths of a batch merged where they share ancestors
+            if len(results) == 1:
+                backpropagate(*results[0])
             else:
-                reward, total = self._simulate_game(color, selected_node)
-            
-            # backpropagate
-            backpropagate(selected_node, reward, total)
+                backpropagate_batch(results)
 
             # if we choose to fortify, end turn now
-            if edge_to_parent and edge_to_parent.data["type"] == "f":
+            if not budgeted and fortified:
                 break
 
-        root = search_tree.get_root()
-        children = sorted([(node, node.num_visits) for _, node in root.children], reverse=True,
-                          key=lambda item: item[1])
-        best_child = children[0][0]
+        search_tree.context.playouts += playouts.playouts
+        search_tree.context.playout_turns += playouts.turns
+        search_tree.context.iterations += i
+        search_tree.context.cpu_seconds += time.process_time() - cpu_start
 
+        return search_tree
 
-        edge = root.get_edge_to_child(best_child)
-        color_idx = get_color_index(color)
+    def _select_leaves(self, color, root, count, widening=None):
+        # selections still waiting for their evaluation carry a virtual loss, so the next descent of the same batch
+        # is pushed towards another leaf; a leaf reached twice is only expanded once
+        virtual_losses = {}
+        leaves = []
+
+        for _ in range(count):
+            leaf, _ = self._traverse_tree(color, root, virtual_losses, widening)
+
+            if leaf not in leaves:
+                leaves.append(leaf)
+
+        return leaves
+
+    def _expand_node(self, color, selected_node, possible_actions, depth, widening=None):
+        edge_to_parent = None
+
+        if selected_node.parent:
+            edge_to_parent = selected_node.parent.get_edge_to_child(selected_node)
+
+        previous_action_code = None if selected_node.parent is None else edge_to_parent.data
+        previous_action = None if previous_action_code is None else get_action_kind(previous_action_code)
+
+        # force fortification if the node's children would be the last layer of the turn tree, and stop there
+        if selected_node.depth >= depth - 1:
+            possible_actions = []
+        elif selected_node.depth == depth - 2 and previous_action != FORTIFY:
+            possible_actions = [FORTIFY]
+
+        if PLACE in possible_actions and previous_action == ATTACK:
+            possible_actions.remove(PLACE)
+        elif previous_action == FORTIFY:
+            possible_actions = []
+        elif ADVANCE in possible_actions:
+            possible_actions.remove(ADVANCE)
+
+        # if action taken previously, then remove (except for attack)
+        if previous_action != ATTACK and previous_action in possible_actions:
+            possible_actions.remove(previous_action)
+
+        # a node already expanded (reached again once a budgeted search has explored its children) is only
+        # simulated
+        if selected_node.has_children():
+            possible_actions = []
+
+        state = selected_node.data
+
+        for action in possible_actions:
+            if action == ATTACK:
+                if widening is None:
+                    selected_node = self._blitz_attack(color, selected_node, state)
+                else:
+                    selected_node.defer_children(self._get_attack_candidates(color, state))
+                    selected_node.widen(get_widening_limit(widening, selected_node.num_visits))
+
+            elif action == PLACE:
+                troops_by_territories = min(3, state.count_territories(get_color_index(color)) // 3)
+                troops_by_continent = self._get_continent_owned_bonus(color, state)
+                troops_by_card = self._get_card_trade_bonus(color, state)
+                total_troops = troops_by_territories + troops_by_continent + troops_by_card
+
+                selected_node.add_unbuilt_child(encode_action(PLACE, troops=total_troops),
+                                                partial(self._build_place_child, color, total_troops))
+
+            elif action == ADVANCE:
+                if not is_action_won(previous_action_code):
+                    continue
+
+                attacking_territory = get_action_source(previous_action_code)
+                territory_won = get_action_target(previous_action_code)
+
+                # the number of troops moved is filled into the action once the child is built
+                selected_node.add_unbuilt_child(encode_action(ADVANCE, attacking_territory, territory_won),
+                                                partial(self._build_advance_child, color, attacking_territory,
+                                                        territory_won))
+
+            else:
+                selected_node.add_unbuilt_child(encode_action(FORTIFY), partial(self._build_fortify_child, color))
+
+        return possible_actions, edge_to_parent
+
+    # children are added unbuilt: these build a child's state (and final action) from its parent's state when the
+    # search first selects it
 
-        turn = [(edge, best_child)]
+    def _build_place_child(self, color, total_troops, state):
+        # new_state, allocated_troops = \
+        #      self._reinforce_weak_territories(color, total_troops, state.copy(), 3)
+        new_state, allocated_troops = \
+            self._reinforce_owned_key_territories(color, total_troops, state.copy(), 0.6, 3)
+        # new_state, allocated_troops = \
+        #     self._reinforce_attacked_territories(color, total_troops, state.copy(), 0.4, 3)
 
-        # Take action
-        while len(best_child.children) > 0:
-            edge, best_child, _ = sorted([(e, node, node.num_visits) for e, node in best_child.children],
-                                         reverse=True, key=lambda x: x[2])[0]
-            turn.append((edge, best_child))
+        return new_state, encode_action(PLACE, troops=total_troops)
 
-        final_position = turn[-1][1]
-        self.TERRITORIES_OWNED, self._troops_on_board, self.TERRITORY_ATTACK_COUNT = final_position.data
+    def _build_advance_child(self, color, attacking_territory, territory_won, state):
+        new_state = self._transfer_troops(color, attacking_territory, territory_won, state, 0.1, 0.1, 0.1)
+        troops_moved = new_state.get_troops(territory_won) - state.get_troops(territory_won)
+
+        return new_state, encode_action(ADVANCE, attacking_territory, territory_won, troops_moved)
+
+    def _build_fortify_child(self, color, state):
+        return self._fortify_weakest_territories(color, state), encode_action(FORTIFY)
+
+    def _is_search_budget_spent(self, search_tree, iterations, deadline, max_iterations, max_nodes):
+        if max_iterations is not None and iterations >= max_iterations:
+            return True
+        if max_nodes is not None and search_tree.context.node_count >= max_nodes:
+            return True
+
+        return deadline is not None and time.perf_counter() >= deadline
+
+    def _get_principal_line(self, node):
+        # the most visited child at every level, down to a leaf: the turn the search settled on. Below the visited
+        # nodes the first child that would be expanded is built and followed
+        turn = []
+
+        while node.has_children():
+            if not node.children:
+                node.widen(1)
+                node.build_child()
+
+            edge, node, _ = sorted([(e, child, child.num_visits) for e, child in node.children],
+                                   reverse=True, key=lambda x: x[2])[0]
+            turn.append((edge, node))
+
+        return turn
+
+    def _summarize_root(self, search_tree):
+        # per root action: merged statistics for root-parallel search, and where the search would take the turn
+        summary = []
+
+        root = search_tree.get_root()
+        if not root.children and root.has_children():
+            root.widen(1)
+            root.build_child()
+
+        for edge, child in root.children:
+            turn = [(edge, child)] + self._get_principal_line(child)
+            summary.append((edge.data, child.num_visits, child.reward, [e.data for e, _ in turn],
+                            turn[-1][1].data))
+
+        return summary
+
+    def _root_parallel_search(self, color, max_ms, max_iterations, max_nodes, batch_size, widening):
+        if self._search_pool is None:
+            self._search_pool = ProcessPoolExecutor(self.SEARCH_WORKERS)
+
+        futures = [self._search_pool.submit(_run_search_worker, self, color, self.rng.getrandbits(32),
+                                            max_ms, max_iterations, max_nodes, batch_size, widening)
+                   for _ in range(self.SEARCH_WORKERS)]
+        results = [future.result() for future in futures]
+
+        # merge the root children of every worker's tree by action; the turn played for the chosen action is the
+        # one from the worker that visited it most
+        merged = {}
+        for summary, _ in results:
+            for action, num_visits, reward, turn, final_state in summary:
+                visits_so_far, reward_so_far, best_visits, best_turn = merged.get(action, (0, 0, -1, None))
+                if num_visits > best_visits:
+                    best_visits, best_turn = num_visits, (turn, final_state)
+
+                merged[action] = (visits_so_far + num_visits, reward_so_far + reward, best_visits, best_turn)
+
+        self.search_stats = {"workers": len(results)}
+        for _, stats in results:
+            for name, value in stats.items():
+                if name == "layers":
+                    self.search_stats[name] = max(self.search_stats.get(name, 0), value)
+                elif isinstance(value, (int, float)):
+                    self.search_stats[name] = self.search_stats.get(name, 0) + value
+
+        transpositions = [stats["transpositions"] for _, stats in results if "transpositions" in stats]
+        if transpositions:
+            self.search_stats["transpositions"] = merge_counters(transpositions)
+
+        best_action = max(merged, key=lambda action: merged[action][0])
+        return merged[best_action][3]
+
+    def find_best_move(self, color, max_ms=None, max_iterations=None, max_nodes=None, batch_size=None, widening=None):
+        """
+        Searches color's turn within the given budgets (defaulting to the SEARCH_MAX_* settings), plays the best turn
+        found so far and returns it as a list of action codes (see actions.decode_action). batch_size (default
+        SEARCH_BATCH_SIZE) is the number of leaves selected and evaluated together per search step, and widening
+        (default SEARCH_WIDENING) the (c, alpha) progressive widening of attacks, see _search.
+        """
+        print(color)
+
+        max_ms = self.SEARCH_MAX_MS if max_ms is None else max_ms
+        max_iterations = self.SEARCH_MAX_ITERATIONS if max_iterations is None else max_iterations
+        max_nodes = self.SEARCH_MAX_NODES if max_nodes is None else max_nodes
+        batch_size = self.SEARCH_BATCH_SIZE if batch_size is None else batch_size
+        widening = self.SEARCH_WIDENING if widening is None else widening
+
+        if self.SEARCH_WORKERS > 1:
+            turn, final_state = self._root_parallel_search(color, max_ms, max_iterations, max_nodes, batch_size,
+                                                           widening)
+        else:
+            search_tree = self._search(color, max_ms, max_iterations, max_nodes, batch_size, widening)
+            self.search_stats = search_tree.get_search_stats()
+
+            # Take action
+            line = self._get_principal_line(search_tree.get_root())
+            turn = [edge.data for edge, _ in line]
+            final_state = line[-1][1].data if line else search_tree.get_root().data
+
+        self._apply_game_state(final_state)
 
         self._draw_card(color)
         self.change_turn()
 
+        return turn
+
     def run_place_troops(self):
         if not self.PICK_TERRITORIES_MODE:
             return
 
         self.ATTACK_MODE = False
-        territories = list(self._location_troop_coordinates.keys())
         run = True
 
         while run:
@@ -1272,15 +1393,13 @@ class RiskGame:
 
                 territory_selected = ""
                 if len(self.TERRITORIES_REMAINING) == 0:
-                    territory_selected = random.choice(self.TERRITORIES_OWNED[color])
+                    territory_selected = self.rng.choice(self.TERRITORIES_OWNED[color])
                 else:
                     territory_selected = self._select_territory(color, self.TERRITORIES_REMAINING)
                     self.TERRITORIES_REMAINING.remove(territory_selected)
-                    self.TERRITORIES_OWNED[color].append(territory_selected)
-
-                color_index = get_color_index(color)
+                    self._set_territory_owner(territory_selected, color)
 
-                self._troops_on_board[territory_selected][color_index].number += 1
+                self.state.add_troops(territory_selected, 1)
                 self.TERRITORIES_REMAINING_COUNT[color] -= 1
 
                 self.change_turn()
@@ -1288,100 +1407,47 @@ class RiskGame:
         self.PICK_TERRITORIES_MODE = False
         self.ATTACK_MODE = True
 
-    def _calculate_territories_owned_value(self, color):
-
-        continents_information = {
-            "AS": {"bonus": 7, "territory_count": 12},
-            "AF": {"bonus": 3, "territory_count": 6},
-            "NA": {"bonus": 5, "territory_count": 9},
-            "SA": {"bonus": 2, "territory_count": 4},
-            "AU": {"bonus": 2, "territory_count": 4},
-            "EU": {"bonus": 5, "territory_count": 7}
-        }
-
-        territories_by_continent = {
-            "NA": ["Alaska", "Northwest Territory", "Greenland", "Alberta", "Ontario", "Quebec",
-                   "Western United States", "Eastern United States", "Central America"],
-            "SA": ["Venezuela", "Peru", "Brazil", "Argentina"],
-            "EU": ["Iceland", "Scandinavia", "Ukraine", "Great Britain", "Northern Europe", "Southern Europe",
-                   "Western Europe"],
-            "AF": ["North Africa", "Egypt", "East Africa", "Congo", "South Africa", "Madagascar"],
-            "AS": ["Ural", "Siberia", "Yakutsk", "Kamchatka", "Afghanistan", "Middle East", "India", "China",
-                   "Mongolia", "Japan", "Irkutsk", "Kazakhstan", "Siam"],
-            "AU": ["Indonesia", "New Guinea", "Western Australia", "Eastern Australia"]
-        }
-
-        territories_owned = self.TERRITORIES_OWNED[color]
-
-        value = 0
-
-        for continent, information in continents_information.items():
-            territories_in_continent = [t for t in territories_owned if t in territories_by_continent[continent]]
-
-            continent_proportion = len(territories_in_continent) / information["territory_count"]
-            continent_proportion_bonus = continent_proportion * information["bonus"]
-
-            value += continent_proportion_bonus
-
-        return value
-        pass
-
-    def _get_troop_count_from_territory(self, territory, gamestate):
-        if gamestate is None:
-            gamestate = self._troops_on_board
-        for troop in gamestate[territory]:
-            if troop.number > 0:
-                return troop.number
-
-        return 0
-
-    def _get_troop_from_territory(self, territory, gamestate):
-        if gamestate is None:
-            gamestate = self._troops_on_board
-        for troop in gamestate[territory]:
-            if troop.number > 0:
-                return troop
-
-    def _calculate_troop_strength(self, color, gamestate, territories):
-        territories_owned = self.TERRITORIES_OWNED[color]
-        colors = ["Red", "Black", "Light Blue", "Green"]
-        colors.remove(color)
-
-        total_troops = 0
-        color_troops = 0
-
-        for c in colors:
-            for territory in territories[c]:
-                troop_count = self._get_troop_count_from_territory(territory, gamestate)
-                total_troops += 1
+    def _get_troop_count_from_territory(self, territory, state=None):
+        if state is None:
+            state = self.state
 
-        for territory in self.TERRITORIES_OWNED[color]:
-            troop_count = self._get_troop_count_from_territory(territory, gamestate)
-            color_troops += 0 if troop_count is None else troop_count
+        return state.get_troops(territory)
+
+    def evaluate_game_state(self, state, color):
+        # a batch of one, so the single and batched evaluations cannot drift apart
+        return float(self.evaluate_game_states([state], color)[0])
 
-        return round((color_troops / total_troops) * 100, 2)
+    def evaluate_game_states(self, states, color):
+        """
+        Static evaluation of a list of states for color, in one pass: the boards are stacked and every term is
+        computed for all of them at once with NumPy. Returns an array of values, in the order of states.
 
-    def _get_continents_owned(self, color, territories_in_gs):
-        continent_bonus = self._get_continent_owned_bonus(color, territories_in_gs)
+        The terms are the continent proportions weighted by their bonuses (geographic positioning), the territories
+        owned, the troop strength (troops on the territories color owns in the live position, as a percentage of the
+        number of territories the other colors hold) and the bonuses of the continents held. A state where the other
+        colors hold no territory has an infinite troop strength, so it is worth math.inf, like a won game.
+        """
+        color_index = get_color_index(color)
+        boards = np.stack([state.board for state in states])
+        owners = boards[:, OWNER]
+        owned = owners == color_index
 
-        return continent_bonus
+        num_territories_owned = owned.sum(axis=1)
 
-    def evaluate_game_state(self, gamestate, territories_in_gs, color):
-        num_territories_owned = len(territories_in_gs[color])
-        territory_proportions = self._calculate_territories_owned_value(color)
-        troop_strength = self._calculate_troop_strength(color, gamestate, territories_in_gs)
-        continents_owned = self._get_continents_owned(color, territories_in_gs)
-        # max_risk_on_position = random.randint(0, self.TURNS_PLAYED)
+        continent_counts = owned.astype(np.int64) @ CONTINENT_MEMBERSHIP
+        territory_proportions = (continent_counts / CONTINENT_SIZE_VECTOR * CONTINENT_BONUS_VECTOR).sum(axis=1)
+        continents_owned = ((continent_counts == CONTINENT_SIZE_VECTOR) * CONTINENT_BONUS_VECTOR).sum(axis=1)
 
-        geographic_positioning_coefficient = 0.75
-        territories_owned_coefficient = 0.5
-        troop_strength_coefficient = 0.4
-        continents_owned_coefficient = 0.88
-        # risk_coefficient = random.random() * max_risk_on_position
+        live_owned = self.state.owner == color_index
+        color_troops = boards[:, TROOPS, live_owned].sum(axis=1)
+        total_troops = ((owners != color_index) & (owners != NO_OWNER)).sum(axis=1)
+        troop_strength = np.full(len(states), math.inf)
+        np.divide(color_troops, total_troops, out=troop_strength, where=total_troops > 0)
+        troop_strength = np.round(troop_strength * 100, 2)
 
-        return geographic_positioning_coefficient * territory_proportions + territories_owned_coefficient * \
-               num_territories_owned + troop_strength * troop_strength_coefficient + continents_owned * \
-               continents_owned_coefficient
+        return GEOGRAPHIC_POSITIONING_COEFFICIENT * territory_proportions + TERRITORIES_OWNED_COEFFICIENT * \
+            num_territories_owned + TROOP_STRENGTH_COEFFICIENT * troop_strength + CONTINENTS_OWNED_COEFFICIENT * \
+            continents_owned
 
     def run_attack_turns(self):
         if not self.ATTACK_MODE:
@@ -1413,19 +1479,11 @@ class RiskGame:
         self.ATTACK_MODE = False
 
     def draw(self):
-        self.surface.blit(self.BACKGROUND, (0, 0))
-        self.ui_callback()
-
-        for _, troops in self._troops_on_board.items():
-            for troop in troops:
-                troop.draw()
+        # the pygame view renders the model; headless games have nothing to draw
+        if self.view is None:
+            return
 
-        pygame.display.update()
+        self.view.draw(self.state)
 
     def _check_territory_owned(self, territory_to_attack):
-        for color in self.TERRITORIES_OWNED.keys():
-            color_index = get_color_index(color)
-            if self._troops_on_board[territory_to_attack][color_index].number > 0:
-                return True
-
-        return False
+        return self.state.get_troops(TERRITORY_INDEX[territory_to_attack]) > 0
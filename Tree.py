@@ -1,27 +1,383 @@
+from collections import OrderedDict
+
+from actions import ACTION_TYPES, FORTIFY, get_action_kind
+from game_state import COLORS, GameState
+from topology import TERRITORY_COUNT
+from transposition import NodeStats
+
+# a node more than this many edges below its nearest full state is stored in full again, bounding the replay
+CHECKPOINT_INTERVAL = 8
+STATE_CACHE_SIZE = 128
+
+
 class Edge:
-    def __init__(self, parent_node, child_node, data=None):
-        self.parent = parent_node
-        self.child = child_node
+    # the (edge, child) pair in the parent's children list already links the two nodes, an edge only holds the data
+    __slots__ = ("data",)
+
+    def __init__(self, data=None):
         self.data = data
 
 
+def _is_fortify(data):
+    return isinstance(data, int) and get_action_kind(data) == FORTIFY
+
+
+class StateCache:
+    """
+    Least recently used map of node -> materialized state, shared by every node of one tree.
+    """
+
+    def __init__(self, size=STATE_CACHE_SIZE):
+        self.size = size
+        self.states = OrderedDict()
+
+    def get(self, node):
+        state = self.states.get(node)
+        if state is not None:
+            self.states.move_to_end(node)
+
+        return state
+
+    def put(self, node, state):
+        self.states[node] = state
+        self.states.move_to_end(node)
+
+        if len(self.states) > self.size:
+            self.states.popitem(last=False)
+
+
+class SearchContext:
+    """
+    What the nodes of one tree share: the cache of materialized states, the context key folded into every node key,
+    the node count and depth of the deepest node (kept up to date by add_child; lazily added nodes are counted in
+    unbuilt_nodes until they are built, those held back for widening in deferred_candidates) and, optionally,
+    the transposition table that node statistics are shared through and the static evaluation (state -> value)
+    cached on each node.
+
+    With a batch evaluation (list of states -> values) as well, new nodes are queued in pending_evaluations rather
+    than evaluated one by one, and Tree.evaluate_pending scores the whole queue in one call.
+    """
+
+    def __init__(self, key=0, transposition_table=None, evaluate=None, evaluate_batch=None):
+        self.key = key
+        self.state_cache = StateCache()
+        self.transposition_table = transposition_table
+        self.evaluate = evaluate
+        self.evaluate_batch = evaluate_batch
+        self.pending_evaluations = []
+        self.node_count = 1
+        self.unbuilt_nodes = 0
+        self.deferred_candidates = 0
+        self.widened_children = 0
+        self.max_depth = 0
+
+        self.evaluations = 0
+        self.evaluation_cache_hits = 0
+        self.evaluation_batches = 0
+        self.playouts = 0
+        self.playout_turns = 0
+        # selected leaves, and the CPU time (of the process that ran the search) it took
+        self.iterations = 0
+        self.cpu_seconds = 0.0
+
+
 class TreeNode:
-    def __init__(self, data):
-        self.data = data
-        self.children = []
+    """
+    A search node. Once a GameState node is added under a parent it keeps only the packed delta from its parent
+    (see GameState.diff); data rebuilds the full state from the nearest checkpoint ancestor on demand, and the
+    tree's StateCache holds the most recently used ones. States read through data are shared and must not be
+    mutated.
+
+    key is the 64-bit Zobrist key of the position: the state's exact_key (exact troop counts, so different
+    positions do not share statistics) combined with the tree's context key (side to move and card hands, which the
+    search does not change). With a transposition table, nodes with the same key
+    share one NodeStats, so num_visits and reward are the position's rather than the node's; a node with the same
+    key as one of its own ancestors keeps its own.
+
+    Children are kept with a fortify edge (an action code, see actions) last, so get_non_fortify_children gives
+    selection the edges it wants without filtering them.
+
+    When the tree has an evaluation function, value holds the node's static evaluation, computed once when the node
+    joins the tree; get_value reads it.
+
+    Children are added lazily: expansion records them as (action code, build function) descriptors in
+    unbuilt_children, and build_child turns one into a node, running its build function (parent state -> (state,
+    final action code)) only when the search first selects it. For progressive widening a node can also hold back
+    descriptors (defer_children); widen moves them, best first, into unbuilt_children up to a limit the search
+    raises with the node's visits. Descriptors are plain tuples, so a node costs nothing for the children it never
+    builds.
+
+    exhausted marks a node selection has nothing left to grow under: a leaf that expanded into nothing (a fortify
+    child, or one at the depth limit), or a node whose children are all exhausted and that has no unbuilt or deferred
+    children left. Selection passes exhausted nodes by, so a search whose root is exhausted has grown the whole turn
+    tree.
+
+    A built delta node costs about 0.45 KB, against some 2.2 KB for a node holding its full state (measured with
+    tracemalloc): the node object with its slots takes about 150 bytes, its NodeStats 48 (shared with a transposition
+    table), its edge and (edge, child) pair 100, its key, action code and value about 90, and its delta 8 bytes per
+    changed territory, 40-60 for a typical child. Interior nodes add their children list. A checkpoint node, one per
+    CHECKPOINT_INTERVAL levels, keeps its full state instead.
+    """
+    __slots__ = ("_state", "_delta", "_checkpoint_distance", "_context", "_unbuilt", "_deferred", "_widened", "key",
+                 "stats", "value", "depth", "exhausted", "children", "parent")
+
+    def __init__(self, data, context=None):
+        self._state = data
+        self._delta = None
+        self._checkpoint_distance = 0
+        self._context = context
+        self._unbuilt = None
+        self._deferred = None
+        self._widened = 0
+        self.key = None
+        self.stats = NodeStats()
+        self.value = None
+        self.depth = 0
+        self.exhausted = False
+        # a leaf shares the empty tuple, the list is made when the first child is added
+        self.children = ()
         self.parent = None
-        self.num_visits = 0
-        self.reward = 0
+
+        if isinstance(data, GameState):
+            self.key = data.exact_key if context is None else data.exact_key ^ context.key
+            self._share_stats()
+            self._evaluate()
+
+    @property
+    def num_visits(self):
+        return self.stats.num_visits
+
+    @num_visits.setter
+    def num_visits(self, num_visits):
+        self.stats.num_visits = num_visits
+
+    @property
+    def reward(self):
+        return self.stats.reward
+
+    @reward.setter
+    def reward(self, reward):
+        self.stats.reward = reward
+
+    @property
+    def data(self):
+        if self._state is not None:
+            return self._state
+
+        return self._materialize()
+
+    @data.setter
+    def data(self, data):
+        self._state = data
+        self._delta = None
+        self._checkpoint_distance = 0
+
+    @property
+    def unbuilt_children(self):
+        return self._unbuilt or ()
+
+    def has_children(self):
+        # built, unbuilt or deferred: whether the node has been expanded into anything
+        return bool(self.children or self._unbuilt or self._deferred)
 
     def __str__(self):
         return f"Num Visits: {self.num_visits} Data: {self.data}"
 
+    def add_unbuilt_child(self, action, build):
+        if self._unbuilt is None:
+            self._unbuilt = []
+
+        self._unbuilt.append((action, build))
+        self._context.unbuilt_nodes += 1
+
+    def build_child(self, position=0):
+        """
+        Builds the unbuilt child at position in unbuilt_children from this node's state, adds it under the final
+        action code its build function returns and returns it.
+        """
+        action, build = self._unbuilt.pop(position)
+        if not self._unbuilt:
+            self._unbuilt = None
+
+        state, action = build(self.data)
+        child = TreeNode(state)
+        self.add_child(child, action)
+        self._context.unbuilt_nodes -= 1
+
+        return child
+
     def add_child(self, child_node, data=None):
         # if self._is_descendant(child_node):
         #     return  # Avoid adding a cycle to the tree
-        edge = Edge(self, child_node, data)
+        edge = Edge(data)
         child_node.parent = self
-        self.children.append((edge, child_node))
+
+        if not self.children:
+            self.children = [(edge, child_node)]
+        elif _is_fortify(self.children[-1][0].data) and not _is_fortify(data):
+            # the fortify edge stays last
+            self.children.insert(len(self.children) - 1, (edge, child_node))
+        else:
+            self.children.append((edge, child_node))
+
+        if self._context is None:
+            self._context = SearchContext()
+
+        if child_node._context is not self._context:
+            if child_node.key is not None:
+                child_node.key ^= self._context.key ^ (0 if child_node._context is None else child_node._context.key)
+
+            child_node._context = self._context
+            child_node._share_stats()
+            child_node._evaluate()
+
+        child_node._compact()
+        child_node._set_depth(self.depth + 1)
+
+    def defer_children(self, candidates):
+        # (action code, build function) descriptors in priority order, for widen to release
+        if not candidates:
+            return
+
+        self._deferred = candidates[::-1]
+        self._widened = 0
+        self._context.deferred_candidates += len(candidates)
+
+    def has_candidates(self):
+        return self._deferred is not None
+
+    def widen(self, max_children):
+        """
+        Moves deferred descriptors, best first, into unbuilt_children until max_children of them have been released
+        or none are left, and returns how many were released.
+        """
+        deferred = self._deferred
+        if deferred is None:
+            return 0
+
+        released = 0
+        while self._widened < max_children and deferred:
+            self.add_unbuilt_child(*deferred.pop())
+            self._widened += 1
+            released += 1
+
+        if not deferred:
+            self._deferred = None
+
+        self._context.deferred_candidates -= released
+        self._context.widened_children += released
+
+        return released
+
+    def release_candidate(self):
+        # the next deferred descriptor, whatever the visit limit, for a node whose released children are all exhausted
+        return self.widen(self._widened + 1)
+
+    def mark_exhausted(self):
+        """
+        Marks this node exhausted if it has nothing left to grow, then each ancestor left with only exhausted
+        children, and returns whether this node is exhausted.
+        """
+        node = self
+        while node is not None and not node.exhausted:
+            if node._unbuilt or node._deferred or any(not child.exhausted for _, child in node.children):
+                break
+
+            node.exhausted = True
+            node = node.parent
+
+        return self.exhausted
+
+    def _set_depth(self, depth):
+        # a node added with children of its own carries them down with it
+        stack = [(self, depth)]
+        while stack:
+            node, node_depth = stack.pop()
+            node.depth = node_depth
+            self._context.node_count += 1
+
+            if node_depth > self._context.max_depth:
+                self._context.max_depth = node_depth
+
+            stack.extend((child, node_depth + 1) for _, child in node.children)
+
+    def _evaluate(self):
+        # while the node still holds its full state, so the evaluation never needs a materialization
+        context = self._context
+        if context is None or context.evaluate is None or self.value is not None or \
+                not isinstance(self._state, GameState):
+            return
+
+        if context.evaluate_batch is not None:
+            # the queue keeps the full state, the node itself may be compacted to a delta before the batch runs
+            context.pending_evaluations.append((self, self._state))
+            return
+
+        self.value = context.evaluate(self._state)
+        context.evaluations += 1
+
+    def get_value(self):
+        context = self._context
+
+        if self.value is None:
+            self.value = context.evaluate(self.data)
+            context.evaluations += 1
+        else:
+            context.evaluation_cache_hits += 1
+
+        return self.value
+
+    def _share_stats(self):
+        if self._context is None or self._context.transposition_table is None or self.key is None:
+            return
+
+        # a node holding the same position as one of its ancestors (a move that changed nothing, such as advancing
+        # no armies) keeps its own statistics: every backpropagation through both would count shared ones twice
+        ancestor = self.parent
+        while ancestor is not None:
+            if ancestor.key == self.key:
+                return
+            ancestor = ancestor.parent
+
+        self.stats = self._context.transposition_table.get_stats(self.key)
+
+    def _compact(self):
+        # swap the full state for the delta from the parent, unless this node is due to be a checkpoint
+        if not isinstance(self._state, GameState) or self.parent is None:
+            return
+
+        checkpoint_distance = self.parent._checkpoint_distance + 1
+        if checkpoint_distance >= CHECKPOINT_INTERVAL:
+            return
+
+        state = self._state
+        self._delta = self.parent.data.diff(state)
+        self._state = None
+        self._checkpoint_distance = checkpoint_distance
+        self._context.state_cache.put(self, state)
+
+    def _materialize(self):
+        state_cache = self._context.state_cache
+
+        state = state_cache.get(self)
+        if state is not None:
+            return state
+
+        deltas = []
+        node = self
+        base = None
+
+        while base is None:
+            deltas.append(node._delta)
+            node = node.parent
+            base = node._state if node._state is not None else state_cache.get(node)
+
+        state = base.copy()
+        for delta in reversed(deltas):
+            state.apply_diff(delta)
+
+        state_cache.put(self, state)
+        return state
 
     def _is_descendant(self, node):
         """Check if node is a descendant of self."""
@@ -30,48 +386,39 @@ class TreeNode:
             curr_node = stack.pop()
             if curr_node == node:
                 return True
-            for edge in curr_node.children:
-                if edge.child not in stack:
-                    stack.append(edge.child)
+            for _, child in curr_node.children:
+                if child not in stack:
+                    stack.append(child)
         return False
 
     def get_edge_to_child(self, child_node):
         for edge, child in self.children:
-            if edge.child == child_node:
+            if child is child_node:
                 return edge
         return None
 
-    def is_terminal(self, color):
-        all_territories = []
-        for v in self.data[0].values():
-            for i in v:
-                all_territories.append(i)
-
+    def get_non_fortify_children(self):
+        # the children selection chooses from: all of them but a trailing fortify edge, which ends the turn
+        children = self.children
+        if children and _is_fortify(children[-1][0].data):
+            return children[:-1]
 
-        wins = [len(self.data[0][color]) == len(all_territories) for color in self.data[0]]
+        return children
 
-        return True in wins
+    def is_terminal(self, color):
+        return self.data.get_winner() is not None
 
     def is_winning(self, color):
-        all_territories = []
-        for v in self.data[0].values():
-            for i in v:
-                all_territories.append(i)
+        return self.data.get_winner() == COLORS.index(color)
 
-        return len(self.data[0][color]) == len(all_territories)
 
-
-def get_troop_count_from_territory_ext(territory, gamestate):
-    for troop in gamestate[territory]:
-        if troop.number > 0:
-            return troop.number
-
-    return 0
+def get_troop_count_from_territory_ext(territory, state):
+    return state.get_troops(territory)
 
 
 def _pretty_print_data(node):
     string = ""
-    for k in node:
+    for k in range(TERRITORY_COUNT):
         troop_count = get_troop_count_from_territory_ext(k, node)
         string += str(troop_count)
 
@@ -79,8 +426,25 @@ def _pretty_print_data(node):
 
 
 class Tree:
-    def __init__(self, root_node):
-        self.root = TreeNode(root_node)
+    def __init__(self, root_node, context_key=0, transposition_table=None, evaluate=None, evaluate_batch=None):
+        self.context = SearchContext(context_key, transposition_table, evaluate, evaluate_batch)
+        self.root = TreeNode(root_node, self.context)
+
+    def evaluate_pending(self):
+        # scores every node queued since the last call with one batch evaluation
+        context = self.context
+        pending = [(node, state) for node, state in context.pending_evaluations if node.value is None]
+        context.pending_evaluations = []
+
+        if not pending:
+            return
+
+        values = context.evaluate_batch([state for _, state in pending])
+        for (node, _), value in zip(pending, values):
+            node.value = float(value)
+
+        context.evaluations += len(pending)
+        context.evaluation_batches += 1
 
     def get_root(self):
         return self.root
@@ -99,11 +463,13 @@ class Tree:
             edge, node = node
 
         visited.add(node)
-        node_data = node.data[1]  # unpack tuple and then get gamestate
+        node_data = node.data
 
         action = None
         if edge:
-            if type(edge.data) == type(dict()):
+            if isinstance(edge.data, int):
+                action = ACTION_TYPES[get_action_kind(edge.data)]
+            elif type(edge.data) == type(dict()):
                 action = edge.data["type"]
             else:
                 action = edge.data
@@ -124,12 +490,27 @@ class Tree:
         visited.remove(node)
         return result
 
+    def get_search_stats(self):
+        context = self.context
+        stats = {"nodes": context.node_count, "unbuilt_nodes": context.unbuilt_nodes, "layers": context.max_depth + 1,
+                 "deferred_candidates": context.deferred_candidates, "widened_children": context.widened_children,
+                 "evaluations": context.evaluations, "evaluation_cache_hits": context.evaluation_cache_hits,
+                 "evaluation_batches": context.evaluation_batches, "playouts": context.playouts,
+                 "playout_turns": context.playout_turns, "iterations": context.iterations,
+                 "cpu_seconds": round(context.cpu_seconds, 6)}
+
+        if context.transposition_table is not None:
+            stats["transpositions"] = context.transposition_table.get_counters()
+
+        return stats
+
     def get_num_layers(self, node=None):
         """
-        Returns the number of layers in the tree, including the root.
+        Returns the number of layers in the tree, including the root. The whole tree's count is tracked as nodes
+        are added, so it is O(1); counting the layers under another node still walks its subtree.
         """
-        if node is None:
-            node = self.root
+        if node is None or node is self.root:
+            return self.context.max_depth + 1
         if not node.children:
             return 1
         else:
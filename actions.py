@@ -0,0 +1,62 @@
+from topology import TERRITORY_NAMES
+
+# kinds of turn action, in the order a turn takes them; ACTION_TYPES are the labels used for them in logs
+PLACE, ATTACK, ADVANCE, FORTIFY = range(4)
+ACTION_TYPES = ("p", "a", "ap", "f")
+
+NO_TERRITORY = 63
+
+# an action is one int: | troops | won (1 bit) | target (6 bits) | source (6 bits) | kind (2 bits) |
+_KIND_BITS = 2
+_TERRITORY_BITS = 6
+_SOURCE_SHIFT = _KIND_BITS
+_TARGET_SHIFT = _SOURCE_SHIFT + _TERRITORY_BITS
+_WON_SHIFT = _TARGET_SHIFT + _TERRITORY_BITS
+_TROOPS_SHIFT = _WON_SHIFT + 1
+
+_KIND_MASK = (1 << _KIND_BITS) - 1
+_TERRITORY_MASK = (1 << _TERRITORY_BITS) - 1
+
+
+def encode_action(kind, source=NO_TERRITORY, target=NO_TERRITORY, troops=0, won=False):
+    return kind | source << _SOURCE_SHIFT | target << _TARGET_SHIFT | int(won) << _WON_SHIFT | \
+        troops << _TROOPS_SHIFT
+
+
+def get_action_kind(action):
+    return action & _KIND_MASK
+
+
+def get_action_source(action):
+    return action >> _SOURCE_SHIFT & _TERRITORY_MASK
+
+
+def get_action_target(action):
+    return action >> _TARGET_SHIFT & _TERRITORY_MASK
+
+
+def is_action_won(action):
+    return bool(action >> _WON_SHIFT & 1)
+
+
+def get_action_troops(action):
+    return action >> _TROOPS_SHIFT
+
+
+def decode_action(action):
+    # readable form of an action, for logs and the UI only
+    kind = get_action_kind(action)
+    decoded = {"type": ACTION_TYPES[kind], "troops": get_action_troops(action)}
+
+    source = get_action_source(action)
+    target = get_action_target(action)
+
+    if kind == ATTACK:
+        decoded["won"] = is_action_won(action)
+        decoded["attacking_territory"] = TERRITORY_NAMES[source]
+        decoded["defending_territory"] = TERRITORY_NAMES[target]
+    elif kind == ADVANCE:
+        decoded["from_territory"] = TERRITORY_NAMES[source]
+        decoded["to_territory"] = TERRITORY_NAMES[target]
+
+    return decoded
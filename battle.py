@@ -0,0 +1,333 @@
+import os
+from functools import lru_cache
+from itertools import product
+
+import numpy as np
+
+# written by build_battle_table.py, see load_outcome_table for the layout
+OUTCOME_TABLE_PATH = "battle_outcomes.npy"
+
+
+def _calculate_round_outcomes():
+    # enumerate every roll for each (attack dice, defence dice) pairing once, so a battle can be resolved
+    # exactly as a Markov chain over (attacking armies, defending armies) instead of by sampling
+    round_outcomes = {}
+
+    for attack_dice_count, defence_dice_count in product(range(1, 4), range(1, 3)):
+        losses = {}
+        total = 0
+
+        for rolls in product(range(1, 7), repeat=attack_dice_count + defence_dice_count):
+            attack_dice = sorted(rolls[:attack_dice_count], reverse=True)
+            defence_dice = sorted(rolls[attack_dice_count:], reverse=True)
+
+            attacker_losses = 0
+            defender_losses = 0
+            for attack_roll, defence_roll in zip(attack_dice, defence_dice):
+                if attack_roll > defence_roll:
+                    defender_losses += 1
+                else:
+                    attacker_losses += 1
+
+            losses[(attacker_losses, defender_losses)] = losses.get((attacker_losses, defender_losses), 0) + 1
+            total += 1
+
+        round_outcomes[(attack_dice_count, defence_dice_count)] = [
+            (attacker_losses, defender_losses, count / total)
+            for (attacker_losses, defender_losses), count in sorted(losses.items())
+        ]
+
+    return round_outcomes
+
+
+def _calculate_roll_losses():
+    # losses for every possible roll of five dice (three attack, two defence) and every number of dice each side
+    # can roll, packed as attacker losses * 4 + defender losses and indexed by
+    # (attack dice * 3 + defence dice) * 6 ** 5 + roll
+    rolls = np.arange(6 ** 5)[:, None] // 6 ** np.arange(5) % 6 + 1
+    roll_losses = np.zeros((4, 3, 6 ** 5), dtype=np.int32)
+
+    for attack_dice_count, defence_dice_count in product(range(1, 4), range(1, 3)):
+        attack_dice = -np.sort(-rolls[:, :attack_dice_count], axis=1)
+        defence_dice = -np.sort(-rolls[:, 3:3 + defence_dice_count], axis=1)
+        comparisons = min(attack_dice_count, defence_dice_count)
+
+        defender_losses = (attack_dice[:, :comparisons] > defence_dice[:, :comparisons]).sum(axis=1)
+        roll_losses[attack_dice_count, defence_dice_count] = (comparisons - defender_losses) * 4 + defender_losses
+
+    return roll_losses.reshape(-1)
+
+
+ROUND_OUTCOMES = _calculate_round_outcomes()
+ROLL_LOSSES = _calculate_roll_losses()
+
+_win_probability_cache = {}
+_outcome_table = None
+_outcome_table_loaded = False
+
+
+def get_round_outcomes(attacking_armies, defending_armies):
+    # standard dice rules: attacker rolls up to three dice, always leaving one army behind,
+    # defender rolls up to two
+    return ROUND_OUTCOMES[(min(3, attacking_armies - 1), min(2, defending_armies))]
+
+
+def _resolve_win_probability(attacking_armies, defending_armies):
+    if defending_armies <= 0:
+        return 1.0
+    if attacking_armies <= 1:
+        return 0.0
+
+    probability = 0.0
+    for attacker_losses, defender_losses, outcome_probability in get_round_outcomes(attacking_armies,
+                                                                                    defending_armies):
+        probability += outcome_probability * _win_probability_cache[
+            (attacking_armies - attacker_losses, defending_armies - defender_losses)]
+
+    return probability
+
+
+def attack_win_probability(attacking_armies, defending_armies):
+    """
+    Returns the exact probability that `attacking_armies` capture a territory held by `defending_armies` when
+    the attacker keeps rolling until the defender is wiped out or only one attacking army is left.
+    """
+    attacking_armies = max(0, int(attacking_armies))
+    defending_armies = max(0, int(defending_armies))
+
+    key = (attacking_armies, defending_armies)
+    if key in _win_probability_cache:
+        return _win_probability_cache[key]
+
+    table = load_outcome_table()
+    if table is not None and attacking_armies <= get_outcome_table_cap(table) and \
+            defending_armies <= get_outcome_table_cap(table):
+        _win_probability_cache[key] = float(table[attacking_armies, defending_armies, 0])
+        return _win_probability_cache[key]
+
+    # fill the chain bottom-up (every round removes at least one army) so that large battles never recurse
+    for attackers in range(attacking_armies + 1):
+        for defenders in range(defending_armies + 1):
+            if (attackers, defenders) not in _win_probability_cache:
+                _win_probability_cache[(attackers, defenders)] = _resolve_win_probability(attackers, defenders)
+
+    return _win_probability_cache[key]
+
+
+def build_outcome_table(max_armies):
+    """
+    Builds the dense battle outcome table for every (attackers, defenders) pair up to `max_armies`.
+
+    table[a, d, 0] is the probability that `a` attackers capture a territory held by `d` defenders,
+    table[a, d, 1 + x] is the probability the battle ends with `x` attackers left and no defenders, and
+    table[a, d, max_armies + 2 + y] is the probability it ends with `y` defenders left holding the territory.
+    """
+    cap = max_armies
+    table = np.zeros((cap + 1, cap + 1, 2 * cap + 3))
+
+    for attackers in range(cap + 1):
+        for defenders in range(cap + 1):
+            if defenders == 0:
+                table[attackers, defenders, 0] = 1.0
+                table[attackers, defenders, 1 + attackers] = 1.0
+                continue
+            if attackers <= 1:
+                table[attackers, defenders, cap + 2 + defenders] = 1.0
+                continue
+
+            # every round removes at least one army, so all successor rows are already filled in
+            for attacker_losses, defender_losses, probability in get_round_outcomes(attackers, defenders):
+                table[attackers, defenders] += probability * table[attackers - attacker_losses,
+                                                                   defenders - defender_losses]
+
+    return table
+
+
+def write_outcome_table(max_armies, path=OUTCOME_TABLE_PATH):
+    table = build_outcome_table(max_armies)
+    np.save(path, table)
+
+    return table
+
+
+def get_outcome_table_cap(table):
+    return table.shape[0] - 1
+
+
+def load_outcome_table(path=OUTCOME_TABLE_PATH):
+    # memory-mapped on first use so startup stays cheap and every process shares the same page-cached copy
+    global _outcome_table, _outcome_table_loaded
+
+    if not _outcome_table_loaded:
+        _outcome_table_loaded = True
+        if os.path.exists(path):
+            _outcome_table = np.load(path, mmap_mode="r")
+
+    return _outcome_table
+
+
+def _propagate_end_state_distribution(attacking_armies, defending_armies):
+    # push probability mass forward from the starting pair; every round removes at least one army, so
+    # walking both counts downwards visits each state after all of the states that feed into it
+    mass = np.zeros((attacking_armies + 1, defending_armies + 1))
+    mass[attacking_armies, defending_armies] = 1.0
+
+    attacker_survivors = np.zeros(attacking_armies + 1)
+    defender_survivors = np.zeros(defending_armies + 1)
+
+    for attackers in range(attacking_armies, -1, -1):
+        for defenders in range(defending_armies, -1, -1):
+            probability = mass[attackers, defenders]
+            if probability == 0:
+                continue
+
+            if defenders == 0:
+                attacker_survivors[attackers] += probability
+                continue
+            if attackers <= 1:
+                defender_survivors[defenders] += probability
+                continue
+
+            for attacker_losses, defender_losses, outcome_probability in get_round_outcomes(attackers, defenders):
+                mass[attackers - attacker_losses, defenders - defender_losses] += probability * outcome_probability
+
+    return attacker_survivors, defender_survivors
+
+
+@lru_cache(maxsize=4096)
+def get_end_state_distribution(attacking_armies, defending_armies):
+    """
+    Returns two arrays for a battle fought to completion: the probability of it ending with `x` attackers left
+    after capturing the territory (indexed by `x`) and of it ending with `y` defenders left holding it (indexed
+    by `y`). Pairs inside the precomputed table are read straight from it.
+    """
+    attacking_armies = max(0, int(attacking_armies))
+    defending_armies = max(0, int(defending_armies))
+
+    table = load_outcome_table()
+    if table is not None and attacking_armies <= get_outcome_table_cap(table) and \
+            defending_armies <= get_outcome_table_cap(table):
+        cap = get_outcome_table_cap(table)
+        row = table[attacking_armies, defending_armies]
+
+        return np.array(row[1:attacking_armies + 2]), np.array(row[cap + 2:cap + 3 + defending_armies])
+
+    return _propagate_end_state_distribution(attacking_armies, defending_armies)
+
+
+@lru_cache(maxsize=4096)
+def get_expected_losses(attacking_armies, defending_armies):
+    """
+    Returns the expected number of (attacking, defending) armies lost when the battle is fought to completion.
+    """
+    attacker_survivors, defender_survivors = get_end_state_distribution(attacking_armies, defending_armies)
+
+    # when the defender holds, the attacker is always left with a single army (or none if it started with none)
+    attackers_left = float(np.dot(attacker_survivors, np.arange(len(attacker_survivors)))) + \
+        min(1, attacking_armies) * float(defender_survivors.sum())
+    defenders_left = float(np.dot(defender_survivors, np.arange(len(defender_survivors))))
+
+    return attacking_armies - attackers_left, defending_armies - defenders_left
+
+
+@lru_cache(maxsize=4096)
+def get_most_likely_outcomes(attacking_armies, defending_armies, k=3):
+    """
+    Returns the `k` most likely end states of the battle as (attackers left, defenders left, probability) tuples,
+    most likely first.
+    """
+    attacker_survivors, defender_survivors = get_end_state_distribution(attacking_armies, defending_armies)
+
+    outcomes = [(attackers, 0, float(p)) for attackers, p in enumerate(attacker_survivors) if p > 0]
+    outcomes += [(min(1, attacking_armies), defenders, float(p)) for defenders, p in enumerate(defender_survivors)
+                 if p > 0]
+
+    return tuple(sorted(outcomes, key=lambda outcome: outcome[2], reverse=True)[:k])
+
+
+@lru_cache(maxsize=4096)
+def get_attack_outcome(attacking_armies, defending_armies):
+    """
+    Returns (won, attackers left, defenders left) for the most likely end state on the more likely side of the
+    battle, i.e. the result an attack is expected to produce.
+    """
+    attacker_survivors, defender_survivors = get_end_state_distribution(attacking_armies, defending_armies)
+
+    if attack_win_probability(attacking_armies, defending_armies) > 0.5:
+        return True, int(np.argmax(attacker_survivors)), 0
+
+    return False, min(1, max(0, int(attacking_armies))), int(np.argmax(defender_survivors))
+
+
+
+def simulate_attacks(attacking_armies, defending_armies, rng=None):
+    """
+    Fights many independent battles to completion at once, one round of dice per loop iteration for every
+    battle still running. Takes arrays (or scalars) of attacking and defending army counts and returns the
+    (attackers left, defenders left) arrays.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    attackers, defenders = np.broadcast_arrays(np.array(attacking_armies, dtype=np.int64, ndmin=1),
+                                               np.array(defending_armies, dtype=np.int64, ndmin=1))
+    attackers = attackers.copy()
+    defenders = defenders.copy()
+
+    index = np.flatnonzero((attackers > 1) & (defenders > 0))
+    remaining_attackers = attackers[index].astype(np.int32)
+    remaining_defenders = defenders[index].astype(np.int32)
+
+    while index.size > 0:
+        # one draw picks all five dice, offset into the loss table for the number of dice each side rolls
+        rolls = rng.integers(0, 6 ** 5, size=index.size, dtype=np.int32)
+        rolls += (np.minimum(3, remaining_attackers - 1) * 3 + np.minimum(2, remaining_defenders)) * 6 ** 5
+
+        losses = ROLL_LOSSES[rolls]
+        remaining_attackers -= losses >> 2
+        remaining_defenders -= losses & 3
+
+        # finished battles roll no dice (and so lose nothing), so they are only dropped once they are the majority
+        running = (remaining_attackers > 1) & (remaining_defenders > 0)
+        if np.count_nonzero(running) * 2 <= index.size:
+            attackers[index] = remaining_attackers
+            defenders[index] = remaining_defenders
+            index = index[running]
+            remaining_attackers = remaining_attackers[running]
+            remaining_defenders = remaining_defenders[running]
+
+    return attackers, defenders
+
+
+class DiceStream:
+    """
+    Seedable source of dice rolls backed by a NumPy Generator. Rolls are drawn in bulk into a buffer and handed
+    out one at a time, so a game seeded with the same value replays exactly.
+    """
+
+    def __init__(self, seed=None, buffer_size=65536):
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.buffer_size = buffer_size
+        self._rolls = []
+        self._position = 0
+
+    def _refill(self):
+        self._rolls = self.rng.integers(1, 7, size=self.buffer_size).tolist()
+        self._position = 0
+
+    def roll(self):
+        if self._position == len(self._rolls):
+            self._refill()
+
+        result = self._rolls[self._position]
+        self._position += 1
+
+        return result
+
+    def roll_dice(self, count):
+        return sorted([self.roll() for _ in range(count)], reverse=True)
+
+    def randint(self, low, high):
+        # inclusive on both ends, like random.randint
+        return int(self.rng.integers(low, high + 1))
@@ -0,0 +1,55 @@
+import argparse
+import os
+import time
+
+from Game import RiskGame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure root-parallel search work per CPU-second for each worker "
+                                                 "count.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--max-ms", type=int, default=1000, help="search budget per move, per worker")
+    parser.add_argument("--moves", type=int, default=4, help="moves searched for each worker count")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--widening", type=float, nargs=2, default=[2.0, 0.5], metavar=("C", "ALPHA"),
+                        help="progressive widening, so the tree does not run out of leaves before the budget")
+    args = parser.parse_args()
+
+    # the workers only run side by side on as many CPUs as this process may use
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    print(f"{cpus} CPUs available")
+
+    for workers in args.workers:
+        game = RiskGame(seed=args.seed)
+        game.DRAW = False
+        game.SEARCH_WORKERS = workers
+        game.SEARCH_WIDENING = tuple(args.widening)
+        game.run_place_troops()
+
+        nodes = 0
+        iterations = 0
+        cpu_seconds = 0.0
+        elapsed = 0.0
+        with game:
+            for _ in range(args.moves):
+                color = ["Red", "Light Blue", "Green", "Black"][game.PLAYER]
+
+                start = time.perf_counter()
+                game.find_best_move(color, max_ms=args.max_ms)
+                elapsed += time.perf_counter() - start
+
+                # summed over the workers, each counting the CPU time of its own search
+                nodes += game.search_stats["nodes"]
+                iterations += game.search_stats["iterations"]
+                cpu_seconds += game.search_stats["cpu_seconds"]
+
+        # per CPU-second these stay flat as workers are added, whether or not the workers run at the same time;
+        # CPU-seconds per wall-second is how many of them actually did
+        print(f"{workers} workers: {nodes / cpu_seconds:.0f} nodes and {iterations / cpu_seconds:.0f} iterations "
+              f"per CPU-second, {cpu_seconds / elapsed:.2f} CPU-seconds per second, "
+              f"{elapsed / args.moves * 1000:.0f} ms per move")
+
+
+if __name__ == "__main__":
+    main()
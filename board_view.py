@@ -0,0 +1,100 @@
+import pygame
+from ast import literal_eval as tuple_from_string
+
+from game_state import COLORS
+from topology import TERRITORY_INDEX
+from troop import Troop
+
+
+def create_location_troop_coordinates():
+    troop_locations = {}
+
+    location_file = open("locations.txt")
+    locations = location_file.read().split("\n")
+    location_file.close()
+
+    with open("territories.txt", "r") as territories:
+        start = 0
+        stop = 3
+        for territory in territories.read().split("\n"):
+            if len(territory) == 0:
+                continue
+
+            troop_locations[territory] = [tuple_from_string(x) for x in locations[start:stop + 1]]
+            start = stop + 1
+            stop += 4
+
+    return troop_locations
+
+
+class BoardView:
+    """
+    Pygame rendering of a game: one Troop sprite per color on every territory, drawn from the GameState it is
+    given. All pygame work for the board happens here so the game model can run without a display.
+    """
+
+    def __init__(self, surface, background, update_ui_callback):
+        self._territory_file_path = "territories.txt"
+        self.surface = surface
+        self.background = background
+        self.ui_callback = update_ui_callback
+        self._location_troop_coordinates = create_location_troop_coordinates()
+
+        self.troops_on_board = self._create_territory_troop_map()
+
+    def _create_territory_troop_map(self):
+        troop_map = {}
+        with open(self._territory_file_path, "r") as data:
+            for territory in data.read().split("\n"):
+                if len(territory) == 0:
+                    continue
+
+                coordinates = self._location_troop_coordinates[territory]
+                troops_created = []
+                for index, coordinate in enumerate(coordinates):
+                    color = COLORS[index]
+                    troops_created.append(Troop(self.surface, color, coordinate, number=0))
+                troop_map[territory] = troops_created
+
+        return troop_map
+
+    def _update_troops(self, state):
+        # only the owner's sprite on a territory shows its troops
+        for territory, troops in self.troops_on_board.items():
+            owner = state.get_owner(TERRITORY_INDEX[territory])
+            troop_count = state.get_troops(TERRITORY_INDEX[territory])
+
+            for color_index, troop in enumerate(troops):
+                troop.number = troop_count if color_index == owner else 0
+
+    def highlight_territory(self, territory, color_index):
+        self.troops_on_board[territory][color_index].highlight = True
+
+    def highlight_attack(self, territory_attacking, territory_defending, attack_color_index, defence_color_index):
+        attack_troop = self.troops_on_board[territory_attacking][attack_color_index]
+        defending_troop = self.troops_on_board[territory_defending][defence_color_index]
+
+        attack_troop.highlight_attack = True
+        attack_troop.arrow = True
+        defending_troop.highlight_defend = True
+        defending_troop.arrow = True
+
+    def kill_highlights(self):
+        for troops in self.troops_on_board.values():
+            for troop in troops:
+                troop.highlight = False
+                troop.arrow = False
+                troop.highlight_attack = False
+                troop.highlight_defend = False
+
+    def draw(self, state):
+        self._update_troops(state)
+
+        self.surface.blit(self.background, (0, 0))
+        self.ui_callback()
+
+        for _, troops in self.troops_on_board.items():
+            for troop in troops:
+                troop.draw()
+
+        pygame.display.update()
@@ -0,0 +1,22 @@
+import argparse
+import time
+
+from battle import OUTCOME_TABLE_PATH, write_outcome_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the battle outcome table loaded by the game.")
+    parser.add_argument("--max-armies", type=int, default=200,
+                        help="largest attacking/defending army count stored in the table")
+    parser.add_argument("--output", default=OUTCOME_TABLE_PATH)
+    args = parser.parse_args()
+
+    start = time.time()
+    table = write_outcome_table(args.max_armies, args.output)
+
+    print(f"Wrote {args.output}: {table.shape[0]}x{table.shape[1]} battles, {table.nbytes / 1e6:.1f} MB "
+          f"in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
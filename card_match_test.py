@@ -1,5 +1,6 @@
 from Game import RiskGame
 from pygame import Surface
+from topology import TERRITORY_INDEX
 
 GAME = RiskGame(Surface((500, 500)))
 color = "Green"
@@ -11,7 +12,8 @@ test_cards_4 = [("Nigeria", "Cavalry"), ("Siam", "Cavalry"), ("Wild", "Wild")]
 
 test_cards_5 = [("Siam", "Cavalry"), ("Nigeria", "Infantry"), ("Wild", "Wild"), ("Siam", "Cavalry")]
 
-GAME.TERRITORIES_OWNED[color] = ["China", "Siam"]
+for territory in ["China", "Siam"]:
+    GAME._set_territory_owner(TERRITORY_INDEX[territory], color)
 GAME.CARDS_OWNED[color] = test_cards_5
 
 print(GAME._get_card_trade_bonus(color))
\ No newline at end of file
@@ -0,0 +1,2 @@
+# card_match_test.py is a script run by hand against a pygame surface, not a pytest module
+collect_ignore = ["card_match_test.py"]
@@ -0,0 +1,146 @@
+import numpy as np
+
+from topology import TERRITORY_COUNT, TERRITORY_BITS, CONTINENT_MASKS, territory_mask, popcount
+from zobrist import exact_troop_key, hash_board, hash_board_exact, owner_key, troop_key
+
+# [Red, Light Blue, Green, Black] ---> Order for referencing colors
+COLORS = ["Red", "Light Blue", "Green", "Black"]
+
+NO_OWNER = -1
+
+# rows of GameState.board
+OWNER = 0
+TROOPS = 1
+ATTACKS = 2
+
+# one packed entry per changed territory in a state delta (see GameState.diff)
+DELTA_DTYPE = np.dtype([("territory", "u1"), ("owner", "i1"), ("troops", "<i4"), ("attacks", "<u2")])
+
+
+class GameState:
+    """
+    Compact position used by the search: one row each of owner (color index), troop count and attack count per
+    territory, indexed by territory id (see topology), plus a bitboard of the territories each color owns and a
+    Zobrist key of the owners and bucketed troop counts (see zobrist). exact_key hashes the exact troop counts
+    instead, so it only matches the same position. Owners and troops must change through the setters so the board,
+    masks and keys stay in step. Copying a state is a single ndarray copy.
+    """
+    __slots__ = ("board", "masks", "key", "exact_key")
+
+    def __init__(self, board=None, masks=None, key=None, exact_key=None):
+        if board is None:
+            board = np.zeros((3, TERRITORY_COUNT), dtype=np.int64)
+            board[OWNER] = NO_OWNER
+
+        if masks is None:
+            masks = [territory_mask(np.flatnonzero(board[OWNER] == color_index).tolist())
+                     for color_index in range(len(COLORS))]
+
+        if key is None:
+            key = hash_board(board[OWNER].tolist(), board[TROOPS].tolist())
+
+        if exact_key is None:
+            exact_key = hash_board_exact(board[OWNER].tolist(), board[TROOPS].tolist())
+
+        self.board = board
+        self.masks = masks
+        self.key = key
+        self.exact_key = exact_key
+
+    def copy(self):
+        return GameState(self.board.copy(), self.masks.copy(), self.key, self.exact_key)
+
+    @property
+    def owner(self):
+        return self.board[OWNER]
+
+    @property
+    def troops(self):
+        return self.board[TROOPS]
+
+    @property
+    def attack_counts(self):
+        return self.board[ATTACKS]
+
+    def get_owner(self, territory):
+        return int(self.board[OWNER, territory])
+
+    def set_owner(self, territory, color_index):
+        previous_owner = int(self.board[OWNER, territory])
+        if previous_owner != NO_OWNER:
+            self.masks[previous_owner] &= ~TERRITORY_BITS[territory]
+        if color_index != NO_OWNER:
+            self.masks[color_index] |= TERRITORY_BITS[territory]
+
+        owner_change = owner_key(territory, previous_owner) ^ owner_key(territory, color_index)
+        self.key ^= owner_change
+        self.exact_key ^= owner_change
+        self.board[OWNER, territory] = color_index
+
+    def get_troops(self, territory):
+        return int(self.board[TROOPS, territory])
+
+    def set_troops(self, territory, troops):
+        previous_troops = int(self.board[TROOPS, territory])
+        self.key ^= troop_key(territory, previous_troops) ^ troop_key(territory, troops)
+        self.exact_key ^= exact_troop_key(territory, previous_troops) ^ exact_troop_key(territory, troops)
+        self.board[TROOPS, territory] = troops
+
+    def add_troops(self, territory, troops):
+        self.set_troops(territory, int(self.board[TROOPS, territory]) + troops)
+
+    def get_attack_count(self, territory):
+        return int(self.board[ATTACKS, territory])
+
+    def add_attack(self, territory):
+        self.board[ATTACKS, territory] += 1
+
+    def get_territories(self, color_index):
+        return np.flatnonzero(self.board[OWNER] == color_index).tolist()
+
+    def diff(self, other):
+        """
+        The columns where other differs from this state, packed as DELTA_DTYPE bytes (8 per changed territory).
+        apply_diff replays them onto a copy of this state to rebuild other.
+        """
+        changed = np.flatnonzero((self.board != other.board).any(axis=0))
+
+        delta = np.empty(changed.size, dtype=DELTA_DTYPE)
+        delta["territory"] = changed
+        delta["owner"] = other.board[OWNER, changed]
+        delta["troops"] = other.board[TROOPS, changed]
+        delta["attacks"] = other.board[ATTACKS, changed]
+
+        return delta.tobytes()
+
+    def apply_diff(self, delta):
+        delta = np.frombuffer(delta, dtype=DELTA_DTYPE)
+        territories = delta["territory"]
+
+        for territory, owner, troops in zip(territories.tolist(), delta["owner"].tolist(), delta["troops"].tolist()):
+            self.set_owner(territory, owner)
+            self.set_troops(territory, troops)
+
+        self.board[ATTACKS, territories] = delta["attacks"]
+
+    def get_territory_mask(self, color_index):
+        return self.masks[color_index]
+
+    def count_territories(self, color_index):
+        return popcount(self.masks[color_index])
+
+    def owns_continent(self, color_index, continent):
+        continent_mask = CONTINENT_MASKS[continent]
+        return self.masks[color_index] & continent_mask == continent_mask
+
+    def get_winner(self):
+        # the color holding every owned territory, if there is one
+        owned = 0
+        for mask in self.masks:
+            owned |= mask
+
+        for color_index, mask in enumerate(self.masks):
+            if owned and mask == owned:
+                return color_index
+
+        return None
@@ -156,6 +156,8 @@ def main():
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 WIDGETS.handle_clicks()
 
+    GAME.close()
+
 
 if __name__ == "__main__":
     main()
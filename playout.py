@@ -0,0 +1,188 @@
+import math
+import random
+
+import numpy as np
+
+from battle import ROLL_LOSSES
+from game_state import COLORS, GameState, NO_OWNER, OWNER, TROOPS
+from topology import CONTINENT_BONUSES, CONTINENT_TERRITORIES, NEIGHBORS, TERRITORY_COUNT
+
+RANDOM_POLICY = "random"
+HEURISTIC_POLICY = "heuristic"
+
+DEFAULT_HORIZON = 8
+DEFAULT_MAX_ATTACKS = 6
+
+# the loss table as a plain list, indexed in Python once per round of dice
+_ROLL_LOSSES = ROLL_LOSSES.tolist()
+_ROLLS = 6 ** 5
+_CONTINENTS = tuple((CONTINENT_TERRITORIES[continent], bonus) for continent, bonus in CONTINENT_BONUSES.items())
+
+
+def _fight(attackers, defenders, rng):
+    # one battle to completion with real dice: a single draw picks the five dice of a round (see battle.ROLL_LOSSES)
+    while attackers > 1 and defenders > 0:
+        losses = _ROLL_LOSSES[(min(3, attackers - 1) * 3 + min(2, defenders)) * _ROLLS + rng.randrange(_ROLLS)]
+        attackers -= losses >> 2
+        defenders -= losses & 3
+
+    return attackers, defenders
+
+
+class PlayoutEngine:
+    """
+    Plays the game on from a position for a number of turns, every player moving in turn order with a cheap
+    policy, and scores where it ends. A playout works on the owner and troop rows of a GameState as plain lists:
+
+    - each turn the player receives min(3, territories // 3) armies plus continent bonuses (the same rule as the
+      search, without cards) and puts them all on one border territory;
+    - it then fights up to max_attacks battles to completion with real dice, moving all but one army into every
+      territory it takes. The random policy attacks from a random border territory with two or more armies and
+      stops at random; the heuristic policy reinforces and attacks from its strongest border territory, always
+      picks the attack with the biggest army advantage and only attacks with the advantage on its side.
+
+    A playout stops early when one color holds every territory. Otherwise it is cut off after `horizon` turns and
+    the final positions of a run are scored together with evaluate_batch (list of GameStates -> values).
+    """
+
+    def __init__(self, evaluate_batch, horizon=DEFAULT_HORIZON, policy=HEURISTIC_POLICY,
+                 max_attacks=DEFAULT_MAX_ATTACKS, rng=None):
+        if policy not in (RANDOM_POLICY, HEURISTIC_POLICY):
+            raise ValueError(f"unknown playout policy: {policy}")
+
+        self.evaluate_batch = evaluate_batch
+        self.horizon = horizon
+        self.policy = policy
+        self.max_attacks = max_attacks
+        # the module's generator by default, so seeding random seeds the playouts too
+        self.rng = random if rng is None else rng
+
+        self.playouts = 0
+        self.turns = 0
+
+    def run(self, state, color_index, first_player, count=1):
+        """
+        Plays `count` playouts from state, the first turn being first_player's, and returns color_index's reward
+        for each: math.inf when color_index wins, the cutoff evaluation of the final position otherwise.
+        """
+        rewards = [None] * count
+        final_positions = []
+        cutoff = []
+
+        for playout in range(count):
+            owner = state.board[OWNER].tolist()
+            troops = state.board[TROOPS].tolist()
+
+            winner = self._play(owner, troops, first_player)
+            if winner == color_index:
+                rewards[playout] = math.inf
+                continue
+
+            final_positions.append((owner, troops))
+            cutoff.append(playout)
+
+        if cutoff:
+            boards = []
+            for owner, troops in final_positions:
+                board = np.zeros_like(state.board)
+                board[OWNER] = owner
+                board[TROOPS] = troops
+                boards.append(GameState(board))
+
+            for playout, value in zip(cutoff, self.evaluate_batch(boards)):
+                rewards[playout] = float(value)
+
+        self.playouts += count
+        return rewards
+
+    def _play(self, owner, troops, first_player):
+        players = len(COLORS)
+        player = first_player
+
+        for _ in range(self.horizon):
+            territories = [t for t in range(TERRITORY_COUNT) if owner[t] == player]
+
+            if territories:
+                self.turns += 1
+                self._take_turn(owner, troops, player, territories)
+
+                if owner.count(player) == TERRITORY_COUNT:
+                    return player
+
+            player = (player + 1) % players
+
+        return None
+
+    def _take_turn(self, owner, troops, player, territories):
+        rng = self.rng
+        heuristic = self.policy == HEURISTIC_POLICY
+
+        reinforcements = min(3, len(territories) // 3)
+        for continent, bonus in _CONTINENTS:
+            if all(owner[t] == player for t in continent):
+                reinforcements += bonus
+
+        borders = [t for t in territories if any(owner[n] != player for n in NEIGHBORS[t])]
+        if not borders:
+            return
+
+        if heuristic:
+            front = max(borders, key=lambda t: troops[t])
+        else:
+            front = rng.choice(borders)
+        troops[front] += reinforcements
+
+        for _ in range(self.max_attacks):
+            if heuristic:
+                attack = self._best_attack(owner, troops, player, borders)
+            else:
+                attack = self._random_attack(owner, troops, player, borders)
+
+            if attack is None:
+                break
+
+            source, target = attack
+            attackers, defenders = _fight(troops[source], troops[target], rng)
+
+            if defenders == 0:
+                owner[target] = player
+                troops[target] = attackers - 1
+                troops[source] = 1
+                # the captured territory can attack on, the border list is only used to pick sources
+                borders.append(target)
+            else:
+                troops[source] = attackers
+                troops[target] = defenders
+
+            if not heuristic and rng.random() < 0.25:
+                break
+
+    def _best_attack(self, owner, troops, player, borders):
+        best = None
+        best_advantage = 1
+
+        for source in borders:
+            if owner[source] != player:
+                continue
+
+            for target in NEIGHBORS[source]:
+                if owner[target] == player or owner[target] == NO_OWNER:
+                    continue
+
+                advantage = troops[source] - troops[target]
+                if advantage > best_advantage:
+                    best, best_advantage = (source, target), advantage
+
+        return best
+
+    def _random_attack(self, owner, troops, player, borders):
+        sources = [t for t in borders if owner[t] == player and troops[t] > 1]
+        if not sources:
+            return None
+
+        source = self.rng.choice(sources)
+        targets = [t for t in NEIGHBORS[source] if owner[t] != player and owner[t] != NO_OWNER]
+        if not targets:
+            return None
+
+        return source, self.rng.choice(targets)
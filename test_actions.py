@@ -0,0 +1,31 @@
+import pytest
+
+from topology import TERRITORY_NAMES
+from actions import ADVANCE, ATTACK, FORTIFY, NO_TERRITORY, PLACE, decode_action, encode_action, get_action_kind, \
+    get_action_source, get_action_target, get_action_troops, is_action_won
+
+
+@pytest.mark.parametrize("kind, source, target, troops, won", [
+    (PLACE, NO_TERRITORY, NO_TERRITORY, 7, False),
+    (ATTACK, 0, 41, 0, True),
+    (ATTACK, 41, 0, 0, False),
+    (ADVANCE, 12, 13, 250, False),
+    (FORTIFY, NO_TERRITORY, NO_TERRITORY, 0, False),
+])
+def test_encode_decode_round_trip(kind, source, target, troops, won):
+    action = encode_action(kind, source, target, troops, won)
+
+    assert get_action_kind(action) == kind
+    assert get_action_source(action) == source
+    assert get_action_target(action) == target
+    assert get_action_troops(action) == troops
+    assert is_action_won(action) == won
+
+
+def test_decode_action_names_territories():
+    decoded = decode_action(encode_action(ATTACK, 0, 1, won=True))
+
+    assert decoded["type"] == "a"
+    assert decoded["won"] is True
+    assert decoded["attacking_territory"] == TERRITORY_NAMES[0]
+    assert decoded["defending_territory"] == TERRITORY_NAMES[1]
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+from battle import attack_win_probability, simulate_attacks
+
+
+@pytest.mark.parametrize("attackers, defenders", [(2, 1), (3, 2), (5, 3), (10, 10), (20, 8)])
+def test_simulate_attacks_matches_win_probability(attackers, defenders):
+    battles = 20000
+    rng = np.random.default_rng(attackers * 100 + defenders)
+
+    attackers_left, defenders_left = simulate_attacks(np.full(battles, attackers), defenders, rng)
+    wins = np.mean(defenders_left == 0)
+
+    # four standard errors of the simulated frequency
+    probability = attack_win_probability(attackers, defenders)
+    assert abs(wins - probability) <= 4 * np.sqrt(probability * (1 - probability) / battles) + 1e-9
+    assert np.all((defenders_left == 0) | (attackers_left == 1))
@@ -0,0 +1,46 @@
+import numpy as np
+
+from game_state import ATTACKS, GameState
+
+
+def _random_state(rng):
+    state = GameState()
+    for territory in range(state.board.shape[1]):
+        state.set_owner(territory, int(rng.integers(0, 4)))
+        state.set_troops(territory, int(rng.integers(1, 40)))
+
+    return state
+
+
+def test_diff_apply_diff_round_trip():
+    rng = np.random.default_rng(0)
+    parent = _random_state(rng)
+
+    child = parent.copy()
+    child.set_owner(3, (parent.get_owner(3) + 1) % 4)
+    child.set_troops(3, 1)
+    child.add_troops(17, 250)
+    child.board[ATTACKS, 17] += 2
+
+    rebuilt = parent.copy()
+    rebuilt.apply_diff(parent.diff(child))
+
+    assert np.array_equal(rebuilt.board, child.board)
+    assert rebuilt.masks == child.masks
+    assert rebuilt.key == child.key
+    assert rebuilt.exact_key == child.exact_key
+    assert parent.diff(parent) == b""
+
+
+def test_exact_key_tells_apart_troop_counts_the_bucketed_key_shares():
+    state = _random_state(np.random.default_rng(1))
+    state.set_troops(0, 10)
+
+    other = state.copy()
+    other.add_troops(0, 1)
+
+    assert other.key == state.key
+    assert other.exact_key != state.exact_key
+
+    other.add_troops(0, -1)
+    assert other.exact_key == state.exact_key
@@ -0,0 +1,63 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from game_state import GameState
+from playout import HEURISTIC_POLICY, RANDOM_POLICY, PlayoutEngine
+from topology import TERRITORY_COUNT
+
+
+def _random_state(rng):
+    state = GameState()
+    for territory in range(TERRITORY_COUNT):
+        state.set_owner(territory, int(rng.integers(0, 4)))
+        state.set_troops(territory, int(rng.integers(1, 10)))
+
+    return state
+
+
+@pytest.mark.parametrize("policy", [RANDOM_POLICY, HEURISTIC_POLICY])
+def test_seeded_playouts_repeat_and_leave_the_state_alone(policy):
+    state = _random_state(np.random.default_rng(0))
+    board = state.board.copy()
+    batches = []
+
+    def evaluate_batch(states):
+        batches.append(len(states))
+        return [float(s.count_territories(0)) for s in states]
+
+    first = PlayoutEngine(evaluate_batch, horizon=4, policy=policy, rng=random.Random(7))
+    second = PlayoutEngine(evaluate_batch, horizon=4, policy=policy, rng=random.Random(7))
+
+    rewards = first.run(state, 0, 1, count=3)
+    assert second.run(state, 0, 1, count=3) == rewards
+
+    assert len(rewards) == 3
+    assert np.array_equal(state.board, board)
+    # the cut-off positions of a run are scored in one batch
+    assert batches == [3, 3]
+    assert first.playouts == 3
+    assert 0 < first.turns <= 3 * 4
+
+
+def test_playout_won_before_the_cutoff_is_never_evaluated():
+    state = GameState()
+    for territory in range(TERRITORY_COUNT):
+        state.set_owner(territory, 0)
+        state.set_troops(territory, 10)
+    state.set_owner(5, 1)
+    state.set_troops(5, 1)
+
+    def evaluate_batch(states):
+        raise AssertionError("a won playout was evaluated")
+
+    engine = PlayoutEngine(evaluate_batch, horizon=1, rng=random.Random(0))
+
+    assert engine.run(state, 0, 0) == [math.inf]
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        PlayoutEngine(lambda states: [], policy="greedy")
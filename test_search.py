@@ -0,0 +1,120 @@
+import signal
+from contextlib import contextmanager
+
+from Game import RiskGame, backpropagate, backpropagate_batch
+from game_state import GameState
+from transposition import TranspositionTable
+from Tree import Tree, TreeNode
+
+COLORS = ["Red", "Light Blue", "Green", "Black"]
+
+
+def _build_tree():
+    root = TreeNode("root")
+    a, b, c, d = (TreeNode(name) for name in "abcd")
+    root.add_child(a)
+    root.add_child(b)
+    a.add_child(c)
+    a.add_child(d)
+
+    return root, {"root": root, "a": a, "b": b, "c": c, "d": d}
+
+
+def test_backpropagate_batch_matches_serial():
+    serial_root, serial = _build_tree()
+    batch_root, batch = _build_tree()
+    results = [("c", 1.5, 1), ("d", 2.0, 1), ("b", 0.5, 2), ("c", 1.0, 1), ("root", 0.25, 1)]
+
+    for name, reward, total in results:
+        backpropagate(serial[name], reward, total)
+    backpropagate_batch([(batch[name], reward, total) for name, reward, total in results])
+
+    for name in serial:
+        assert batch[name].num_visits == serial[name].num_visits
+        assert batch[name].reward == serial[name].reward
+    assert batch_root.num_visits == 6
+
+
+def test_node_repeating_an_ancestor_position_keeps_its_own_stats():
+    position = GameState()
+    position.set_owner(0, 0)
+    position.set_troops(0, 5)
+    moved = position.copy()
+    moved.add_troops(0, 1)
+
+    tree = Tree(position, transposition_table=TranspositionTable())
+    root = tree.get_root()
+    child, other_child = TreeNode(moved), TreeNode(moved.copy())
+    root.add_child(child)
+    root.add_child(other_child)
+    # a move that changed nothing, back on the child's own path
+    repeat = TreeNode(moved.copy())
+    child.add_child(repeat)
+
+    assert other_child.stats is child.stats
+    assert repeat.stats is not child.stats
+
+    backpropagate(repeat, 1.0, 1)
+    assert root.num_visits == 1
+    assert child.num_visits == 1
+    assert repeat.num_visits == 1
+
+
+@contextmanager
+def _time_limit(seconds):
+    def fail(signum, frame):
+        raise TimeoutError(f"search still running after {seconds} s")
+
+    previous = signal.signal(signal.SIGALRM, fail)
+    signal.alarm(seconds)
+    try:
+        yield
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _mid_game(seed=1, moves=3):
+    game = RiskGame(seed=seed)
+    game.DRAW = False
+    game.run_place_troops()
+
+    for color in COLORS[:moves]:
+        game.find_best_move(color, max_iterations=50)
+
+    return game
+
+
+def test_node_budget_ends_once_spent_or_fully_grown():
+    game = _mid_game()
+
+    with _time_limit(10):
+        for color in COLORS:
+            for max_nodes in (10, 40, 300):
+                tree = game._search(color, max_nodes=max_nodes)
+
+                assert tree.context.node_count >= max_nodes or tree.get_root().exhausted
+
+
+def test_widening_search_reaches_its_node_budget():
+    game = _mid_game()
+
+    with _time_limit(10):
+        for color in COLORS:
+            tree = game._search(color, max_nodes=300, widening=(1.0, 0.5))
+
+            assert tree.context.node_count >= 300
+            assert tree.context.widened_children > 0
+
+
+def test_root_parallel_search_merges_every_worker_stats():
+    game = _mid_game()
+    game.SEARCH_WORKERS = 2
+
+    with _time_limit(60), game:
+        turn = game.find_best_move(COLORS[3], max_iterations=40, widening=(1.0, 0.5))
+
+    assert turn
+    assert game.search_stats["workers"] == 2
+    assert game.search_stats["iterations"] == 80
+    assert game.search_stats["cpu_seconds"] > 0
@@ -0,0 +1,101 @@
+import numpy as np
+
+from card_maps import territory_attack_map
+
+# territories are interned to integer ids (their position here); names are only for display and logs
+TERRITORY_NAMES = tuple(territory_attack_map)
+TERRITORY_INDEX = {name: index for index, name in enumerate(TERRITORY_NAMES)}
+TERRITORY_COUNT = len(TERRITORY_NAMES)
+
+
+def _build_adjacency():
+    # CSR layout: the neighbors of territory t are indices[indptr[t]:indptr[t + 1]], with the duplicate entries
+    # in card_maps.territory_attack_map removed
+    indptr = [0]
+    indices = []
+
+    for name in TERRITORY_NAMES:
+        indices.extend(TERRITORY_INDEX[neighbor] for neighbor in dict.fromkeys(territory_attack_map[name]))
+        indptr.append(len(indices))
+
+    return np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int64)
+
+
+ADJACENCY_INDPTR, ADJACENCY_INDICES = _build_adjacency()
+
+ADJACENCY_MATRIX = np.zeros((TERRITORY_COUNT, TERRITORY_COUNT), dtype=bool)
+ADJACENCY_MATRIX[np.repeat(np.arange(TERRITORY_COUNT), np.diff(ADJACENCY_INDPTR)), ADJACENCY_INDICES] = True
+
+# plain tuples of the CSR rows for loops in Python, where indexing NumPy scalars is slow
+NEIGHBORS = tuple(tuple(ADJACENCY_INDICES[ADJACENCY_INDPTR[t]:ADJACENCY_INDPTR[t + 1]].tolist())
+                  for t in range(TERRITORY_COUNT))
+
+
+def get_territory_id(name):
+    return TERRITORY_INDEX[name]
+
+
+def get_territory_name(territory):
+    return TERRITORY_NAMES[territory]
+
+
+def get_neighbors(territory):
+    return NEIGHBORS[territory]
+
+
+def is_adjacent(territory, other_territory):
+    return bool(ADJACENCY_MATRIX[territory, other_territory])
+
+
+def _build_continents():
+    territories_by_continent = {
+        "NA": ["Alaska", "Northwest Territory", "Greenland", "Alberta", "Ontario", "Quebec",
+               "Western United States", "Eastern United States", "Central America"],
+        "SA": ["Venezuela", "Peru", "Brazil", "Argentina"],
+        "EU": ["Iceland", "Scandinavia", "Ukraine", "Great Britain", "Northern Europe", "Southern Europe",
+               "Western Europe"],
+        "AF": ["North Africa", "Egypt", "East Africa", "Congo", "South Africa", "Madagascar"],
+        "AS": ["Ural", "Siberia", "Yakutsk", "Kamchatka", "Afghanistan", "Middle East", "India", "China",
+               "Mongolia", "Japan", "Irkutsk", "Siam"],
+        "AU": ["Indonesia", "New Guinea", "Western Australia", "Eastern Australia"]
+    }
+
+    return {continent: tuple(TERRITORY_INDEX[name] for name in names)
+            for continent, names in territories_by_continent.items()}
+
+
+# ownership is kept as bitboards: bit t of a player's mask is set when they own territory t
+TERRITORY_BITS = tuple(1 << t for t in range(TERRITORY_COUNT))
+ALL_TERRITORIES_MASK = (1 << TERRITORY_COUNT) - 1
+
+
+def territory_mask(territories):
+    mask = 0
+    for t in territories:
+        mask |= TERRITORY_BITS[t]
+
+    return mask
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+CONTINENT_TERRITORIES = _build_continents()
+CONTINENT_BONUSES = {"NA": 5, "SA": 2, "EU": 5, "AF": 3, "AS": 7, "AU": 2}
+CONTINENT_MASKS = {continent: territory_mask(territories) for continent, territories in CONTINENT_TERRITORIES.items()}
+CONTINENT_SIZES = {continent: len(territories) for continent, territories in CONTINENT_TERRITORIES.items()}
+
+
+def _build_continent_membership():
+    # continents as columns, in CONTINENT_BONUSES order, for scoring many positions at once with NumPy
+    membership = np.zeros((TERRITORY_COUNT, len(CONTINENT_BONUSES)), dtype=np.int64)
+    for column, continent in enumerate(CONTINENT_BONUSES):
+        membership[list(CONTINENT_TERRITORIES[continent]), column] = 1
+
+    return membership
+
+
+CONTINENT_MEMBERSHIP = _build_continent_membership()
+CONTINENT_BONUS_VECTOR = np.array(list(CONTINENT_BONUSES.values()), dtype=np.int64)
+CONTINENT_SIZE_VECTOR = CONTINENT_MEMBERSHIP.sum(axis=0)
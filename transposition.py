@@ -0,0 +1,70 @@
+from collections import OrderedDict
+
+# the cap counts entries, not bytes: an entry takes about 180 bytes (the OrderedDict slot and link, the NodeStats and
+# its reward), 215 once its key is no longer shared with a node, so about 40 MB at the default cap
+DEFAULT_MAX_ENTRIES = 200000
+
+
+class NodeStats:
+    """
+    Visit count and accumulated reward of a position. Search nodes that reach the same position hold the same
+    NodeStats, so a visit through one path counts for all of them.
+    """
+    __slots__ = ("num_visits", "reward")
+
+    def __init__(self):
+        self.num_visits = 0
+        self.reward = 0
+
+
+class TranspositionTable:
+    """
+    Position key (an exact Zobrist key, see zobrist) -> NodeStats, holding at most max_entries positions. When full the
+    least recently used position is evicted; nodes already sharing its stats keep them, later nodes reaching the
+    position start afresh.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_stats(self, key):
+        stats = self.entries.get(key)
+
+        if stats is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return stats
+
+        self.misses += 1
+        stats = NodeStats()
+        self.entries[key] = stats
+
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+        return stats
+
+    def get_hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get_counters(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.get_hit_rate(), 4),
+                "evictions": self.evictions, "resident": len(self.entries)}
+
+
+def merge_counters(counters):
+    # the get_counters of several tables (one per search worker) as one: totals, and the hit rate of the total
+    hits, misses = sum(c["hits"] for c in counters), sum(c["misses"] for c in counters)
+
+    return {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses) if hits + misses else 0.0, 4),
+            "evictions": sum(c["evictions"] for c in counters), "resident": sum(c["resident"] for c in counters)}
@@ -0,0 +1,103 @@
+import numpy as np
+
+from card_maps import risk_cards
+from topology import TERRITORY_COUNT
+
+PLAYER_COUNT = 4
+
+# troop counts are hashed by bucket, so positions that differ by an army or two on a large stack share a key;
+# a count of at least TROOP_BUCKET_LIMITS[-1] falls in the last bucket
+TROOP_BUCKET_LIMITS = (1, 2, 3, 4, 6, 9, 14, 20, 30, 45)
+TROOP_BUCKET_COUNT = len(TROOP_BUCKET_LIMITS) + 1
+
+_TROOP_BUCKETS = tuple(sum(troops >= limit for limit in TROOP_BUCKET_LIMITS)
+                       for troops in range(TROOP_BUCKET_LIMITS[-1] + 1))
+
+CARD_INDEX = {(card[0], card[1]): index for index, card in enumerate(risk_cards)}
+MAX_CARD_COPIES = max(card[2] for card in risk_cards)
+
+
+def _random_keys(rng, *shape):
+    # nested lists of Python ints: XOR on ints is cheaper than on NumPy scalars
+    return rng.integers(0, 2 ** 64, size=shape, dtype=np.uint64).tolist()
+
+
+# fixed seed: keys must agree between processes so positions can be matched across search workers
+_rng = np.random.default_rng(0x5EED2157)
+
+OWNER_KEYS = _random_keys(_rng, TERRITORY_COUNT, PLAYER_COUNT)
+TROOP_KEYS = _random_keys(_rng, TERRITORY_COUNT, TROOP_BUCKET_COUNT)
+SIDE_TO_MOVE_KEYS = _random_keys(_rng, PLAYER_COUNT)
+CARD_KEYS = _random_keys(_rng, PLAYER_COUNT, len(risk_cards), MAX_CARD_COPIES)
+
+# exact troop counts, for keys that must tell every position apart (the transposition table): counts of at least
+# EXACT_TROOP_KEY_COUNT, which are rare, get a key mixed from the territory's last one
+EXACT_TROOP_KEY_COUNT = 128
+EXACT_TROOP_KEYS = _random_keys(_rng, TERRITORY_COUNT, EXACT_TROOP_KEY_COUNT)
+
+_MASK_64 = 2 ** 64 - 1
+
+
+def _mix_64(value):
+    # the splitmix64 finalizer
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return value ^ (value >> 31)
+
+
+def troop_bucket(troops):
+    if troops >= TROOP_BUCKET_LIMITS[-1]:
+        return TROOP_BUCKET_COUNT - 1
+
+    return _TROOP_BUCKETS[max(troops, 0)]
+
+
+def owner_key(territory, color_index):
+    # unowned territories contribute nothing
+    return OWNER_KEYS[territory][color_index] if color_index >= 0 else 0
+
+
+def troop_key(territory, troops):
+    return TROOP_KEYS[territory][troop_bucket(troops)]
+
+
+def exact_troop_key(territory, troops):
+    if 0 <= troops < EXACT_TROOP_KEY_COUNT:
+        return EXACT_TROOP_KEYS[territory][troops]
+
+    return _mix_64(EXACT_TROOP_KEYS[territory][-1] ^ (troops & _MASK_64))
+
+
+def hash_board(owners, troops):
+    key = 0
+    for territory, (color_index, troop_count) in enumerate(zip(owners, troops)):
+        key ^= owner_key(territory, color_index) ^ troop_key(territory, troop_count)
+
+    return key
+
+
+def hash_board_exact(owners, troops):
+    key = 0
+    for territory, (color_index, troop_count) in enumerate(zip(owners, troops)):
+        key ^= owner_key(territory, color_index) ^ exact_troop_key(territory, troop_count)
+
+    return key
+
+
+def hash_card_hand(color_index, cards):
+    # the k-th copy of a card in a hand has its own key, so duplicates do not cancel out (a reshuffled deck can
+    # hand out more copies than the deck holds, those wrap around)
+    key = 0
+    copies = {}
+
+    for card in cards:
+        card_index = CARD_INDEX[card]
+        copy_index = copies.get(card_index, 0)
+        key ^= CARD_KEYS[color_index][card_index][copy_index % MAX_CARD_COPIES]
+        copies[card_index] = copy_index + 1
+
+    return key
+
+
+def hash_side_to_move(color_index):
+    return SIDE_TO_MOVE_KEYS[color_index]